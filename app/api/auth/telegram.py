@@ -0,0 +1,37 @@
+# app/api/auth/telegram.py
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.core.identity import get_user_by_tg_id
+from app.core.security_tg import validate_telegram_data
+from app.schemas.auth import SessionToken
+from app.security.session import create_session_token, sessions_enabled
+
+router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+
+@router.post("/telegram", response_model=SessionToken)
+async def exchange_init_data(
+    authorization: str = Header(..., alias="Authorization"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Меняем initData на короткий токен сессии.
+    Дальше Mini App ходит в API с "Authorization: Bearer <токен>".
+    """
+    if not sessions_enabled():
+        # Фронт без токена работает дальше с initData (см. getApiToken в base.html)
+        raise HTTPException(status_code=503, detail="Сессии выключены: не задан SECRET_KEY")
+
+    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Неверные данные авторизации")
+
+    user = await get_user_by_tg_id(session, user_data["id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден. Запустите бот через /start")
+
+    token, expires_at = create_session_token(user)
+    return {"access_token": token, "token_type": "bearer", "expires_at": expires_at}
@@ -1,11 +1,16 @@
-from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, AsyncGenerator
+from fastapi import Cookie, Depends, HTTPException, Header, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.database import get_async_session
+from app.core.database import RYW_COOKIE, get_async_session, get_read_session_maker
 from app.security.jwt import oauth2_scheme, decode_access_token
 from app.models.user import User
+from app.core.config import settings
+from app.core.identity import get_user_by_tg_id
+from app.core.security_tg import validate_telegram_data
+from app.schemas.auth import TgUser
+from app.security.session import decode_session_token
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -29,4 +34,64 @@ async def get_current_user(
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
 
-    return user
\ No newline at end of file
+    return user
+
+
+async def get_tg_user_optional(
+    authorization: str = Header(..., alias="Authorization"),
+    session: AsyncSession = Depends(get_async_session)
+) -> TgUser | None:
+    """
+    Достает юзера из заголовка Authorization. Принимает:
+    - "Bearer <токен>" — токен сессии из /api/auth/telegram (подпись + кеш юзеров);
+    - сырую initData от Telegram.
+    None — если initData валидна, но юзер еще не прошел /start.
+    """
+    if authorization.startswith("Bearer "):
+        claims = decode_session_token(authorization.removeprefix("Bearer "))
+        if claims is None:
+            raise HTTPException(
+                status_code=401,
+                detail="Сессия истекла",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_id, tg_id = claims
+        # Роль/профессия — актуальные из кеша (после регистрации он сбрасывается)
+        user = await get_user_by_tg_id(session, tg_id)
+        if user is not None and user.id != user_id:
+            raise HTTPException(status_code=401, detail="Сессия истекла", headers={"WWW-Authenticate": "Bearer"})
+    else:
+        user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
+        if not user_data:
+            raise HTTPException(status_code=401, detail="Неверные данные авторизации")
+
+        user = await get_user_by_tg_id(session, user_data["id"])
+
+    if user is not None:
+        # Сессия запроса общая с хендлером: по этой метке после коммита
+        # запомним, что юзер писал (read-your-writes, см. app/core/database.py)
+        session.info["user_id"] = user.id
+    return user
+
+
+async def get_tg_user(
+    user: TgUser | None = Depends(get_tg_user_optional)
+) -> TgUser:
+    if user is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден. Запустите бот через /start")
+    return user
+
+
+async def get_read_session(
+    user: TgUser | None = Depends(get_tg_user_optional),
+    wrote_at: str | None = Cookie(None, alias=RYW_COOKIE),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для GET-эндпоинтов: читает с реплики (если она настроена).
+    Сразу после своих изменений юзер читает с основной БД — в любом процессе,
+    метку несет кука (см. ReadYourWritesMiddleware).
+    """
+    session_maker = get_read_session_maker(user.id if user else None, wrote_at)
+    async with session_maker() as session:
+        yield session
+
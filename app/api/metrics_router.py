@@ -0,0 +1,23 @@
+# app/api/metrics_router.py
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Header
+
+from app.core.config import settings
+from app.core.db_metrics import db_metrics
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+def check_metrics_token(x_metrics_token: str = Header("", alias="X-Metrics-Token")):
+    # Если токен не задан в настройках — делаем вид, что эндпоинтов нет
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404)
+    if not hmac.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get("/db", dependencies=[Depends(check_metrics_token)])
+async def get_db_metrics():
+    """Пул соединений (занято / свободно), ожидание соединения и время SQL-запросов."""
+    return db_metrics.snapshot()
@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+import html
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from geoalchemy2.shape import from_shape
-from shapely.geometry import Point
+from typing import Optional
+from sqlalchemy import select, func, Select
 from app.schemas.order import OrderReadDetail # <-- Импорт новой схемы
 from sqlalchemy.orm import selectinload
 from app.core.database import get_async_session
 from app.models.user import User
 from app.models.order import Order, OrderStatus
-from app.schemas.order import OrderCreate,OrderRead
-from app.core.security_tg import validate_telegram_data # Ваша функция проверки хеша
+from app.schemas.order import OrderCreate,OrderRead, ORDER_READ_COLUMNS
+from app.api.deps import get_tg_user, get_tg_user_optional, get_read_session
+from app.schemas.auth import TgUser
+from app.services.feed_engine import feed_engine
+from app.services.event_hub import publish
+from app.services.notifier import bot_dispatcher, notify_new_order
+from app.services.outbox import enqueue_message, outbox_relay
+from app.services.order_states import transition
+from app.services.photos import link_order_photos
 from app.core.config import settings
+from app.core.responses import fast_json
 
 
 from sqlalchemy import desc
@@ -22,27 +31,11 @@ router = APIRouter(tags=["Orders"])
 @router.post("/api/orders")
 async def create_order(
     order_data: OrderCreate,
-    # Получаем initData из заголовка Authorization
-    authorization: str = Header(..., alias="Authorization"), 
+    # Юзер из initData (заголовок Authorization), см. app/api/deps.py
+    user: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    # 1. ПРОВЕРКА АВТОРИЗАЦИИ
-    # Валидируем данные от Телеграма
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Неверные данные авторизации")
-
-    tg_id = user_data["id"]
-
-    # 2. ИЩЕМ ЮЗЕРА В БД
-    # Нам нужно связать заказ с конкретным клиентом
-    result = await session.execute(select(User).where(User.tg_id == tg_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден. Запустите бот через /start")
-
-    # 3. ОБРАБОТКА ДАННЫХ
+    # 1. ОБРАБОТКА ДАННЫХ
     # Фото приходят строкой "img1.jpg,img2.jpg", превращаем в список
     photos_list = order_data.photos.split(",") if order_data.photos else []
 
@@ -50,7 +43,7 @@ async def create_order(
     # ВАЖНО: PostGIS использует порядок (X Y) -> (Dolgota Shirota)
     point = f"POINT({order_data.longitude} {order_data.latitude})"
 
-    # 4. СОЗДАЕМ ЗАКАЗ
+    # 2. СОЗДАЕМ ЗАКАЗ
     new_order = Order(
         customer_id=user.id,
         service_type=order_data.service_id,
@@ -64,7 +57,34 @@ async def create_order(
     )
 
     session.add(new_order)
+    await session.flush() # Нужен id для события
+
+    # +1 ссылка на каждое фото (по ним чистится хранилище, см. app/services/photos.py)
+    await link_order_photos(session, new_order.id, new_order.created_at, photos_list)
+
+    # Событие уйдет мастерам (SSE) только после коммита — см. app/services/event_hub.py
+    await publish(session, {
+        "type": "order_created",
+        "order_id": new_order.id,
+        "service_type": new_order.service_type,
+        "lat": order_data.latitude,
+        "lon": order_data.longitude,
+    })
     await session.commit()
+    feed_engine.add_order(new_order.id, new_order.service_type)
+
+    # Рассылка мастерам — в фоне, ответ клиенту не ждет
+    if settings.NOTIFY_NEW_ORDERS:
+        bot_dispatcher.spawn(notify_new_order(
+            bot_dispatcher,
+            order_id=new_order.id,
+            customer_id=user.id,
+            service_type=new_order.service_type,
+            price=new_order.price,
+            address=new_order.address,
+            lat=order_data.latitude,
+            lon=order_data.longitude,
+        ))
     
     return {"status": "ok", "order_id": new_order.id}
 
@@ -72,53 +92,55 @@ async def create_order(
 
 
 
+async def get_order_status(session: AsyncSession, order_id: int, customer_id: int) -> OrderStatus | None:
+    """Статус заказа клиента (None — нет такого заказа или он чужой). Для текста ошибки."""
+    result = await session.execute(
+        select(Order.status).where(Order.id == order_id, Order.customer_id == customer_id)
+    )
+    return result.scalar_one_or_none()
+
+
+def my_orders_query(customer_id: int) -> Select:
+    """
+    Заказы клиента (новые сверху). Только колонки OrderRead — это index-only scan
+    по idx_orders_customer_created, и строки сразу уходят в JSON (без ORM-объектов)
+    """
+    return select(*ORDER_READ_COLUMNS).where(Order.customer_id == customer_id).order_by(desc(Order.created_at))
+
+
 @router.get("/api/orders/my", response_model=list[OrderRead])
 async def get_my_orders(
-    authorization: str = Header(..., alias="Authorization"),
-    session: AsyncSession = Depends(get_async_session)
+    user: TgUser | None = Depends(get_tg_user_optional),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    # 1. Валидация
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    # 2. Ищем юзера
-    result = await session.execute(select(User).where(User.tg_id == user_data["id"]))
-    user = result.scalar_one_or_none()
+    # Юзер еще не зарегистрирован — заказов у него нет
     if not user:
         return []
 
-    # 3. Достаем заказы (новые сверху)
-    stmt = select(Order).where(Order.customer_id == user.id).order_by(desc(Order.created_at))
-    result = await session.execute(stmt)
-    orders = result.scalars().all()
-
-    return orders
-
+    result = await session.execute(my_orders_query(user.id))
+    return fast_json(list[OrderRead], result.mappings().all())
 
 
-@router.get("/api/orders/{order_id}", response_model=OrderReadDetail)
-async def get_order_detail(
-    order_id: int,
-    authorization: str = Header(..., alias="Authorization"),
-    session: AsyncSession = Depends(get_async_session)
-):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
 
-    query = (
+def order_detail_query(order_id: int, customer_id: int) -> Select:
+    return (
         select(Order)
-        .join(Order.customer)
         .where(
             Order.id == order_id,
-            User.tg_id == user_data["id"]
+            Order.customer_id == customer_id
         )
         # ВАЖНО: Подгружаем мастера, иначе Pydantic упадет
-        .options(selectinload(Order.worker)) 
+        .options(selectinload(Order.worker))
     )
-    
-    result = await session.execute(query)
+
+
+@router.get("/api/orders/{order_id}", response_model=OrderReadDetail)
+async def get_order_detail(
+    order_id: int,
+    user: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    result = await session.execute(order_detail_query(order_id, user.id))
     order = result.scalar_one_or_none()
     
     if not order:
@@ -131,39 +153,20 @@ async def get_order_detail(
 @router.post("/api/orders/{order_id}/cancel")
 async def cancel_order(
     order_id: int,
-    authorization: str = Header(..., alias="Authorization"),
+    user: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    # 1. Ищем заказ
-    # Обязательно проверяем customer_id, чтобы нельзя было отменить чужой заказ
-    # stmt = select(Order).where(
-    #     Order.id == order_id,
-    #     Order.customer_id == user.id  # Нужно сначала найти юзера по tg_id, см. ниже полный код
-    # )
-    
-    # --- Поиск юзера (лучше вынести в dependency, но пока так) ---
-    user_res = await session.execute(select(User).where(User.tg_id == user_data["id"]))
-    user = user_res.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    order_res = await session.execute(select(Order).where(Order.id == order_id, Order.customer_id == user.id))
-    order = order_res.scalar_one_or_none()
+    # Один условный UPDATE (см. app/services/order_states.py):
+    # customer_id — чтобы нельзя было отменить чужой заказ, статус проверит сам переход
+    rows = await transition(session, OrderStatus.CANCELED, Order.id == order_id, Order.customer_id == user.id)
 
-    if not order:
-        raise HTTPException(status_code=404, detail="Заказ не найден")
-
-    # 2. Проверяем статус
-    if order.status != OrderStatus.SEARCHING:
+    if not rows:
+        if await get_order_status(session, order_id, user.id) is None:
+            raise HTTPException(status_code=404, detail="Заказ не найден")
         raise HTTPException(status_code=400, detail="Нельзя отменить заказ, который уже в работе или завершен")
 
-    # 3. Отменяем
-    order.status = OrderStatus.CANCELED
     await session.commit()
+    feed_engine.remove_order(order_id)
     
     return {"status": "ok", "message": "Заказ отменен"}
 
@@ -173,35 +176,36 @@ from app.models.order import OrderResponse # Не забудь импортир
 
 # 1. ПОЛУЧИТЬ СПИСОК ОТКЛИКОВ
 
-@router.get("/api/orders/{order_id}/applications", response_model=list[ApplicationRead])
-async def get_order_applications(
-    order_id: int,
-    authorization: str = Header(..., alias="Authorization"),
-    session: AsyncSession = Depends(get_async_session)
-):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    # Ищем заказ и проверяем, что он принадлежит юзеру
-    # (код проверки order/user пропущен для краткости, используй из прошлых примеров)
-    # ...
-
-    # Запрос: Отклики + Данные рабочего + Профиль рабочего
-    # Важно: нужно загрузить relationship worker
-    stmt = (
-        select(OrderResponse)
+def applications_query(order_id: int, customer_id: int) -> Select:
+    # Запрос: Отклики + Данные рабочего
+    # Через join с заказом сразу проверяем, что он принадлежит юзеру
+    return (
+        select(
+            OrderResponse.id, OrderResponse.proposed_price, OrderResponse.message,
+            User.id.label("worker_id"), User.name.label("worker_name"),
+        )
+        .join(OrderResponse.order)
+        .join(User, User.id == OrderResponse.worker_id)
         .where(
-            OrderResponse.order_id == order_id, 
+            OrderResponse.order_id == order_id,
+            Order.customer_id == customer_id,
             OrderResponse.is_skipped == False
         )
-        .options(selectinload(OrderResponse.worker)) 
     )
-    
-    result = await session.execute(stmt)
-    applications = result.scalars().all()
-    
-    return applications
+
+
+@router.get("/api/orders/{order_id}/applications", response_model=list[ApplicationRead])
+async def get_order_applications(
+    order_id: int,
+    user: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    result = await session.execute(applications_query(order_id, user.id))
+    applications = [
+        {**row, "worker": {"id": row["worker_id"], "name": row["worker_name"]}}
+        for row in result.mappings()
+    ]
+    return fast_json(list[ApplicationRead], applications)
 
 
 
@@ -253,38 +257,20 @@ async def get_order_applications(
 @router.post("/api/orders/{order_id}/complete")
 async def complete_order(
     order_id: int,
-    authorization: str = Header(..., alias="Authorization"),
+    user: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    # --- ДОБАВЛЯЕМ ПОИСК ЮЗЕРА ---
-    user_res = await session.execute(select(User).where(User.tg_id == user_data["id"]))
-    user = user_res.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    # -----------------------------
-
-    # Теперь user.id существует
-    order_res = await session.execute(
-        select(Order).where(Order.id == order_id, Order.customer_id == user.id)
-    )
-    order = order_res.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(404, "Заказ не найден")
+    rows = await transition(session, OrderStatus.COMPLETED, Order.id == order_id, Order.customer_id == user.id)
 
-    if order.status != OrderStatus.IN_PROGRESS:
+    if not rows:
+        if await get_order_status(session, order_id, user.id) is None:
+            raise HTTPException(404, "Заказ не найден")
         raise HTTPException(400, "Можно завершить только заказ в работе")
 
-    order.status = OrderStatus.COMPLETED
     await session.commit()
     
     return {"status": "ok", "message": "Заказ завершен"}
 
-from app.loader import bot
 from sqlalchemy.orm import selectinload
 
 
@@ -293,48 +279,68 @@ from sqlalchemy.orm import selectinload
 async def accept_application(
     order_id: int,
     application_id: int,
-    authorization: str = Header(..., alias="Authorization"),
+    # Версия заказа из GET /api/orders/{id} (необязательно)
+    version: Optional[int] = None,
+    user: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    # ... (код проверки авторизации и прав клиента, который мы писали ранее) ...
+    # 1. Один условный UPDATE вместо "прочитать — поменять в Python — записать":
+    #    заказ принадлежит юзеру, еще в поиске (проверит transition), отклик — к этому
+    #    заказу и не пропуск. Из двух одновременных accept строку обновит только один
+    conditions = [
+        Order.id == order_id,
+        Order.customer_id == user.id,
+        OrderResponse.id == application_id,
+        OrderResponse.order_id == Order.id,
+        OrderResponse.order_created_at == Order.created_at,
+        OrderResponse.is_skipped == False,
+        User.id == OrderResponse.worker_id,
+    ]
+    if version is not None:
+        # Клиент видел конкретную версию — не даем принять поверх чужих изменений
+        conditions.append(Order.version == version)
+
+    rows = await transition(
+        session, OrderStatus.IN_PROGRESS, *conditions,
+        values={
+            "worker_id": OrderResponse.worker_id,
+            "price": func.coalesce(OrderResponse.proposed_price, Order.price),
+        },
+        returning=(Order.price, User.tg_id),
+    )
 
-    # 1. Получаем отклик ВМЕСТЕ с данными мастера (чтобы знать его tg_id)
-    stmt = (
-        select(OrderResponse)
-        .where(OrderResponse.id == application_id)
-        .options(selectinload(OrderResponse.worker)) # Подгружаем мастера
+    if not rows:
+        # Редкий путь: разбираемся, что именно не так
+        order_status = await get_order_status(session, order_id, user.id)
+        if order_status is None:
+            raise HTTPException(404, "Заказ не найден или нет прав")
+        app_res = await session.execute(
+            select(OrderResponse.id).where(
+                OrderResponse.id == application_id,
+                OrderResponse.order_id == order_id,
+                OrderResponse.is_skipped == False
+            )
+        )
+        if app_res.scalar_one_or_none() is None:
+            raise HTTPException(404, "Отклик не найден")
+        if order_status != OrderStatus.SEARCHING:
+            raise HTTPException(409, "Мастер для заказа уже выбран или заказ закрыт")
+        raise HTTPException(409, "Заказ изменился, обновите страницу")
+
+    [row] = rows
+    service_type, price, worker_tg_id = row.service_type, row.price, row.tg_id
+
+    # 2. Уведомление мастеру — в outbox, в той же транзакции
+    msg_text = (
+        f"🎉 <b>Ура! Вас выбрали исполнителем!</b>\n\n"
+        f"Заказ: {html.escape(service_type)}\n"
+        f"Цена: {price} ₽\n\n"
+        f"👉 Зайдите в раздел «Мои работы», чтобы увидеть контакты клиента и адрес."
     )
-    app_res = await session.execute(stmt)
-    application = app_res.scalar_one_or_none()
-    
-    if not application:
-        raise HTTPException(404, "Отклик не найден")
-
-    # 2. Получаем заказ
-    order_res = await session.execute(select(Order).where(Order.id == order_id))
-    order = order_res.scalar_one()
-
-    # 3. Обновляем статус заказа
-    order.status = OrderStatus.IN_PROGRESS
-    if application.proposed_price:
-        order.price = application.proposed_price
-    order.worker_id = application.worker_id
+    enqueue_message(session, worker_tg_id, msg_text, parse_mode="HTML")
     
     await session.commit()
-    
-    # --- НОВОЕ: ОТПРАВКА УВЕДОМЛЕНИЯ МАСТЕРУ ---
-    try:
-        worker_tg_id = application.worker.tg_id
-        msg_text = (
-            f"🎉 <b>Ура! Вас выбрали исполнителем!</b>\n\n"
-            f"Заказ: {order.service_type}\n"
-            f"Цена: {order.price} ₽\n\n"
-            f"👉 Зайдите в раздел «Мои работы», чтобы увидеть контакты клиента и адрес."
-        )
-        # Отправляем сообщение
-        await bot.send_message(chat_id=worker_tg_id, text=msg_text, parse_mode="HTML")
-    except Exception as e:
-        print(f"Не удалось отправить уведомление мастеру: {e}")
-    # -------------------------------------------
+    feed_engine.remove_order(order_id) # Заказ больше не ищет мастера
+    outbox_relay.wake() # Отправит в фоне, ответ не ждет Telegram
     
     return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,138 @@
+# app/api/photo_router.py
+"""
+Фото заказов напрямую через MinIO: байты не идут через наш процесс.
+
+1. POST /api/photos/upload-url  -> presigned PUT ссылка (или "уже есть" по sha256)
+2. PUT <upload_url>             -> браузер кладет файл прямо в бакет, во временный tmp/<uuid>
+3. POST /api/photos/finalize    -> сверяем хеш, копируем под имя-хеш и записываем в photos
+4. GET /api/photos/{filename}   -> редирект на presigned GET ссылку
+
+Имена объектов — sha256 содержимого, см. app/services/photos.py. Ссылка на
+PUT никогда не смотрит на итоговый ключ: иначе ее владелец мог бы перезаписать
+уже проверенное фото чем угодно, пока ссылка жива.
+
+После finalize в фоне делаются превью (app/services/images.py).
+"""
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.responses import RedirectResponse
+from minio.error import S3Error
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_tg_user
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.core.storage import (
+    TMP_PREFIX, presigned_upload_url, presigned_photo_url, stat_object, remove_object, object_exists,
+    object_sha256, rename_object,
+)
+from app.schemas.auth import TgUser
+from app.schemas.photo import PhotoUploadRequest, PhotoUploadTicket, PhotoFinalize, PhotoRead, photo_url
+from app.services.images import photo_processor
+from app.services.photos import PHOTO_NAME_PATTERN, photo_key, touch_photo, record_photo
+
+router = APIRouter(tags=["Photos"])
+
+
+@router.post("/api/photos/upload-url", response_model=PhotoUploadTicket)
+async def create_upload_url(
+    data: PhotoUploadRequest,
+    user: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    extension = settings.UPLOAD_ALLOWED_TYPES.get(data.content_type.lower())
+    if extension is None:
+        raise HTTPException(status_code=415, detail="Можно загружать только фото (JPEG, PNG, WebP)")
+
+    filename = photo_key(data.sha256, extension)
+    ticket = {"filename": filename, "upload_url": None, "expires_in": settings.PHOTO_UPLOAD_URL_TTL}
+
+    # Такое фото уже есть — байты не гоняем. Только проверенное (строка в photos):
+    # ее last_used_at бережет фото от photo_gc, пока клиент создает заказ
+    if await touch_photo(session, filename) is not None:
+        await session.commit()
+        return ticket
+
+    ticket["upload_key"] = f"{TMP_PREFIX}{uuid4().hex}"
+    ticket["upload_url"] = presigned_upload_url(ticket["upload_key"])
+    return ticket
+
+
+@router.post("/api/photos/finalize", response_model=PhotoRead)
+async def finalize_upload(
+    data: PhotoFinalize,
+    user: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Клиент загрузил файл по presigned-ссылке: проверяем, что он там есть и подходит."""
+    # Уже проверенное фото (дубликат или повторный finalize) — ничего не делаем
+    photo = await touch_photo(session, data.filename)
+    if photo is not None:
+        await session.commit()
+        if data.upload_key:
+            try:
+                await remove_object(data.upload_key) # Лишняя копия; не удалили — уберет photo_gc
+            except S3Error:
+                pass
+        return {
+            "filename": photo.object_name,
+            "url": photo_url(photo.object_name),
+            "content_type": photo.content_type,
+            "size": photo.size,
+            "deduplicated": True,
+        }
+
+    # Загрузили по ссылке — файл во временном ключе. Без upload_key клиенту сказали
+    # "уже есть", но строку с тех пор удалил photo_gc — сверяем, что лежит под итоговым ключом
+    source = data.upload_key or data.filename
+    try:
+        obj = await stat_object(source)
+        # Presigned PUT не ограничивает ни размер, ни тип — проверяем постфактум
+        content_type = (obj.content_type or "").split(";")[0].strip().lower()
+        if obj.size > settings.UPLOAD_MAX_BYTES or content_type not in settings.UPLOAD_ALLOWED_TYPES:
+            await remove_object(source)
+            if obj.size > settings.UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Файл слишком большой")
+            raise HTTPException(status_code=415, detail="Можно загружать только фото (JPEG, PNG, WebP)")
+
+        # Имя = хеш, который прислал клиент. Сверяем с тем, что реально лежит в бакете
+        if await object_sha256(source) != data.filename.split(".")[0]:
+            await remove_object(source)
+            raise HTTPException(status_code=400, detail="Файл повредился при загрузке, попробуйте еще раз")
+
+        if source != data.filename:
+            # Под итоговым ключом кладем только проверенные байты и только если его еще нет.
+            # Две загрузки одного фото могут скопировать обе — байты у них одинаковые
+            if await object_exists(data.filename):
+                await remove_object(source)
+            else:
+                await rename_object(source, data.filename)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            raise HTTPException(status_code=404, detail="Файл не загружен")
+        raise HTTPException(status_code=502, detail="Хранилище недоступно, попробуйте позже")
+
+    # Две загрузки одного фото одновременно — запишет одна, превью делаем один раз
+    if await record_photo(session, data.filename, user.id, content_type, obj.size, obj.etag):
+        await session.commit()
+        photo_processor.submit(data.filename)
+
+    return {
+        "filename": data.filename,
+        "url": photo_url(data.filename),
+        "content_type": content_type,
+        "size": obj.size,
+    }
+
+
+@router.get("/api/photos/{filename}")
+async def get_photo(filename: str = Path(pattern=PHOTO_NAME_PATTERN)):
+    # Без авторизации: <img> не умеет слать заголовки, а имя — sha256 содержимого
+    # (у старых загрузок — случайный uuid): не зная файла, ссылку не подобрать.
+    # Ссылка одна и та же PHOTO_URL_TTL / 2 — столько же браузер помнит редирект
+    return RedirectResponse(
+        presigned_photo_url(filename),
+        status_code=307,
+        headers={"Cache-Control": f"private, max-age={settings.PHOTO_URL_TTL // 2}"},
+    )
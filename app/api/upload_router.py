@@ -1,18 +1,96 @@
 # app/api/upload_router.py
+import hashlib
 import uuid
-from fastapi import APIRouter, UploadFile, File
-from app.core.storage import upload_file_to_minio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_tg_user
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.core.storage import TMP_PREFIX, stream_to_minio, rename_object, remove_object, stat_object
+from app.schemas.auth import TgUser
+from app.schemas.photo import photo_url
+from app.services.images import photo_processor
+from app.services.photos import SHA256_RE, photo_key, touch_photo, record_photo
 
 router = APIRouter(tags=["Upload"])
 
 @router.post("/api/upload")
-async def upload_image(file: UploadFile = File(...)):
-    # Генерируем уникальное имя, чтобы файлы не перезатерлись
-    file_extension = file.filename.split(".")[-1]
-    new_filename = f"{uuid.uuid4()}.{file_extension}"
-    
-    # Загружаем в MinIO
-    await upload_file_to_minio(file.file, new_filename, file.content_type)
-    
+async def upload_image(
+    request: Request,
+    user: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Тело запроса — сам файл (не multipart), Content-Type — тип картинки.
+    # Так читаем его потоком: ничего не копится во временном файле.
+    # Основной путь для фронта — presigned-загрузка (app/api/photo_router.py)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    extension = settings.UPLOAD_ALLOWED_TYPES.get(content_type)
+    if extension is None:
+        raise HTTPException(status_code=415, detail="Можно загружать только фото (JPEG, PNG, WebP)")
+
+    # Если клиент прислал размер — отказываем сразу, не читая тело
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit():
+        if int(length) > settings.UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Файл слишком большой")
+        if int(length) == 0:
+            raise HTTPException(status_code=400, detail="Пустой файл")
+
+    # Клиент знает хеш заранее — и такое фото уже есть: тело даже не читаем
+    claimed = request.headers.get("x-content-sha256", "").lower() or None
+    if claimed is not None:
+        if not SHA256_RE.match(claimed):
+            raise HTTPException(status_code=400, detail="Неверный X-Content-SHA256")
+        filename = photo_key(claimed, extension)
+        if await touch_photo(session, filename) is not None:
+            await session.commit()
+            return {"filename": filename, "url": photo_url(filename), "deduplicated": True}
+
+    digest = hashlib.sha256()
+
+    async def body():
+        # Размер считаем и сами: Content-Length может не быть (chunked) или он врет
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Файл слишком большой")
+            if chunk:
+                digest.update(chunk)
+                yield chunk
+        if received == 0:
+            raise HTTPException(status_code=400, detail="Пустой файл")
+
+    # Хеш известен только в конце — льем во временный объект, потом переименовываем
+    tmp_name = f"{TMP_PREFIX}{uuid.uuid4()}"
+
+    # Загружаем в MinIO (в отдельном потоке, event loop не блокируется)
+    try:
+        await stream_to_minio(body(), tmp_name, content_type)
+
+        sha256 = digest.hexdigest()
+        if claimed is not None and claimed != sha256:
+            await remove_object(tmp_name)
+            raise HTTPException(status_code=400, detail="Файл повредился при загрузке, попробуйте еще раз")
+
+        new_filename = photo_key(sha256, extension)
+        deduplicated = await touch_photo(session, new_filename) is not None
+        if deduplicated:
+            await remove_object(tmp_name) # Такие байты уже лежат
+        else:
+            await rename_object(tmp_name, new_filename)
+            obj = await stat_object(new_filename)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Ошибка загрузки в MinIO: {e}")
+        raise HTTPException(status_code=502, detail="Хранилище недоступно, попробуйте позже")
+
+    if deduplicated:
+        await session.commit() # last_used_at
+    elif await record_photo(session, new_filename, user.id, content_type, obj.size, obj.etag):
+        await session.commit()
+        photo_processor.submit(new_filename)
+
     # Возвращаем имя файла фронтенду
-    return {"filename": new_filename, "url": f"/static/photos/{new_filename}"} # URL пока условный
\ No newline at end of file
+    return {"filename": new_filename, "url": photo_url(new_filename), "deduplicated": deduplicated}
@@ -1,147 +1,340 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+import asyncio
+import json
+import math
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, not_
+from sqlalchemy import select, and_, exists, func, tuple_, Float, Select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.core.database import get_async_session
-from app.models.user import User
-from app.models.order import Order, OrderStatus, OrderResponse
-from app.schemas.order import OrderReadDetail # Используем схему из прошлого шага
-from app.core.security_tg import validate_telegram_data
 from app.core.config import settings
+from app.core.database import get_async_session, async_session_maker
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.responses import fast_json
+from app.models.user import User, WorkerProfile
+from app.models.order import Order, OrderStatus, OrderResponse
+from app.schemas.order import OrderReadDetail, OrderFeedPage, HomeLocation, ORDER_DETAIL_COLUMNS # Используем схему из прошлого шага
+from app.api.deps import get_tg_user, get_tg_user_optional, get_read_session
+from app.schemas.auth import TgUser
+from app.schemas.response import SwipeAction, SwipeBatch, SwipeResult
+from app.services.swipes import record_swipes, enqueue_application_notices
+from app.services.outbox import outbox_relay
+from app.services.feed_engine import feed_engine
+from app.services.order_states import searching, searching_since
+from app.services.event_hub import event_hub
 
 router = APIRouter(tags=["Worker"])
 
-# 1. ПОЛУЧИТЬ КАРТОЧКУ (Следующий заказ)
-@router.get("/api/worker/feed", response_model=list[OrderReadDetail])
+# 1. ПОЛУЧИТЬ КАРТОЧКИ (Следующая страница заказов)
+@router.get("/api/worker/feed", response_model=OrderFeedPage)
 async def get_worker_feed(
-    authorization: str = Header(..., alias="Authorization"),
-    session: AsyncSession = Depends(get_async_session)
+    # Где сейчас мастер (GPS). Если не передали — берем "домашнюю" точку из профиля
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(settings.FEED_DEFAULT_RADIUS_KM, gt=0, le=settings.FEED_MAX_RADIUS_KM),
+    # next_cursor из прошлой страницы
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50), # Грузим пачками по 10 штук
+    worker: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    # Получаем ID рабочего
-    result = await session.execute(select(User).where(User.tg_id == user_data["id"]))
-    worker = result.scalar_one_or_none()
-
-    # Основной запрос:
-    # 1. Заказ в статусе SEARCHING
-    # 2. Тип услуги совпадает с типом рабочего (опционально, если хочешь)
-    # 3. Рабочий еще НЕ откликался на этот заказ (нет записи в OrderResponse)
-    
-    # Подзапрос: ID заказов, на которые этот рабочий уже реагировал
-    subquery = select(OrderResponse.order_id).where(OrderResponse.worker_id == worker.id)
+    if lat is None or lon is None:
+        home = await get_home_location(session, worker.id)
+        if home:
+            lat, lon = home
+
+    if lat is None or lon is None:
+        # Координат нет — новые сверху. Курсор: последний показанный id
+        after = decode_cursor(cursor, id=int)
+
+        if feed_engine.ready:
+            # Кандидаты считаем в памяти, из БД берем только саму страницу
+            orders, next_before = await feed_engine.page(
+                session, worker.id, worker.service_type,
+                before_id=after["id"] if after else None,
+                limit=limit,
+            )
+            next_cursor = encode_cursor({"id": next_before}) if next_before else None
+            return fast_json(OrderFeedPage, {"items": orders, "next_cursor": next_cursor})
+
+        stmt = newest_feed_query(worker.id, worker.service_type, limit, before_id=after["id"] if after else None)
+        result = await session.execute(stmt)
+        orders = result.mappings().all()
+
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor({"id": orders[-1]["id"]})
+        return fast_json(OrderFeedPage, {"items": orders, "next_cursor": next_cursor})
+
+    # Режим "сначала ближайшие". Курсор: (расстояние, id) последней карточки
+    after = decode_cursor(cursor, d=float, id=int)
+    stmt = nearest_feed_query(
+        worker.id, worker.service_type, limit, lat, lon, radius_km,
+        after=(after["d"], after["id"]) if after else None,
+    )
+    result = await session.execute(stmt)
+    rows = result.mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"d": rows[-1]["distance_m"], "id": rows[-1]["id"]})
+
+    orders = [{**row, "distance_km": round(row["distance_m"] / 1000, 2)} for row in rows]
+    return fast_json(OrderFeedPage, {"items": orders, "next_cursor": next_cursor})
+
 
-    stmt = select(Order).where(
+# Запросы ленты — функциями: их же EXPLAIN'ит scripts/check_plans.py
+def feed_query(worker_id: int, service_type: str | None, limit: int) -> Select:
+    """
+    Основной запрос:
+    1. Заказ в статусе SEARCHING
+    2. Тип услуги совпадает с типом рабочего
+    3. Рабочий еще НЕ откликался на этот заказ (нет записи в OrderResponse).
+       NOT EXISTS (anti-join) идет по уникальному индексу (worker_id, order_id)
+       и не зависит от того, сколько всего свайпов у мастера
+    """
+    already_seen = exists().where(
+        OrderResponse.order_id == Order.id,
+        OrderResponse.order_created_at == Order.created_at,
+        OrderResponse.worker_id == worker_id
+    )
+
+    # Строки только с колонками OrderReadDetail — без ORM-объектов (app/core/responses.py)
+    return select(*ORDER_DETAIL_COLUMNS).where(
         and_(
-            Order.status == OrderStatus.SEARCHING,
-            Order.service_type == worker.service_type, # Фильтр по профессии!
-            not_(Order.id.in_(subquery)) # Исключаем виденные
+            searching(), # Литерал — чтобы работали частичные индексы по статусу
+            # Старше — уже протухли; заодно Postgres читает только свежие партиции
+            Order.created_at >= searching_since(),
+            Order.service_type == service_type, # Фильтр по профессии!
+            ~already_seen # Исключаем виденные
         )
-    ).limit(10) # Грузим пачками по 10 штук
+    ).limit(limit + 1) # +1 — чтобы понять, есть ли следующая страница
 
-    result = await session.execute(stmt)
-    orders = result.scalars().all()
-    return orders
+
+def newest_feed_query(worker_id: int, service_type: str | None, limit: int, before_id: int | None = None) -> Select:
+    """Координат нет — новые сверху. Курсор: последний показанный id."""
+    stmt = feed_query(worker_id, service_type, limit).order_by(Order.id.desc())
+    if before_id is not None:
+        stmt = stmt.where(Order.id < before_id)
+    return stmt
+
+
+def nearest_feed_query(
+    worker_id: int,
+    service_type: str | None,
+    limit: int,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    after: tuple[float, int] | None = None,
+) -> Select:
+    """
+    "Сначала ближайшие": ST_DWithin отсекает всё дальше радиуса, а <-> (KNN)
+    сортирует по расстоянию. Оба работают по частичному GiST-индексу
+    idx_orders_searching_geog на geography(location). after — (расстояние, id).
+    """
+    order_geog = func.geography(Order.location)
+    worker_geog = func.geography(func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326))
+    distance = order_geog.op("<->", return_type=Float)(worker_geog)
+
+    stmt = (
+        feed_query(worker_id, service_type, limit)
+        .add_columns(distance.label("distance_m"))
+        .where(func.ST_DWithin(order_geog, worker_geog, radius_km * 1000))
+        .order_by(distance, Order.id)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(distance, Order.id) > tuple_(*after))
+    return stmt
+
+
+def home_location_query(worker_id: int) -> Select:
+    return (
+        select(func.ST_Y(WorkerProfile.home_location), func.ST_X(WorkerProfile.home_location))
+        .where(WorkerProfile.user_id == worker_id, WorkerProfile.home_location.is_not(None))
+    )
+
+
+async def get_home_location(session: AsyncSession, worker_id: int) -> tuple[float, float] | None:
+    """(lat, lon) "домашней" точки мастера из WorkerProfile или None."""
+    result = await session.execute(home_location_query(worker_id))
+    row = result.first()
+    return (row[0], row[1]) if row else None
+
+
+# 1.1 СОХРАНИТЬ "ДОМАШНЮЮ" ТОЧКУ (откуда мастеру удобно работать)
+@router.put("/api/worker/home-location")
+async def set_home_location(
+    location: HomeLocation,
+    worker: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    point = f"SRID=4326;POINT({location.longitude} {location.latitude})"
+
+    # Профиля может еще не быть — создаем или обновляем одним запросом
+    stmt = pg_insert(WorkerProfile).values(user_id=worker.id, rating=5.0, home_location=point)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WorkerProfile.user_id],
+        set_={"home_location": stmt.excluded.home_location},
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+    return {"status": "ok"}
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по большому кругу (haversine) — для фильтра событий хватает."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
 
 
-# 2. ЛАЙК (ОТКЛИКНУТЬСЯ)
+# 1.2 ПОТОК СОБЫТИЙ (SSE): новые заказы и снятые с ленты — вместо постоянного опроса
+@router.get("/api/worker/stream")
+async def worker_stream(
+    request: Request,
+    # EventSource не умеет заголовки — токен сессии (или initData) передаем в query
+    auth: str = Query(...),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(settings.FEED_DEFAULT_RADIUS_KM, gt=0, le=settings.FEED_MAX_RADIUS_KM),
+):
+    # Сессию держим только на время авторизации: стрим живет долго,
+    # и коннект из пула ему не нужен
+    async with async_session_maker() as session:
+        authorization = auth if "=" in auth else f"Bearer {auth}" # initData — это query-строка
+        worker = await get_tg_user(await get_tg_user_optional(authorization, session))
+        if lat is None or lon is None:
+            home = await get_home_location(session, worker.id)
+            if home:
+                lat, lon = home
+
+    def accept(event: dict) -> bool:
+        if event.get("service_type") != worker.service_type:
+            return False
+        if event.get("type") != "order_created" or lat is None or lon is None:
+            return True # Удаления шлем все: клиенту проще выкинуть лишнее
+        if event.get("lat") is None or event.get("lon") is None:
+            return True
+        return _distance_km(lat, lon, event["lat"], event["lon"]) <= radius_km
+
+    sub = event_hub.subscribe(accept)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Пинг, чтобы прокси не закрыл "молчащее" соединение
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+        finally:
+            event_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# 2. ПАЧКА СВАЙПОВ (лайки и дизлайки одним запросом)
+@router.post("/api/worker/swipes", response_model=list[SwipeResult])
+async def swipe_batch(
+    batch: SwipeBatch,
+    worker: TgUser = Depends(get_tg_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    results = await record_swipes(session, worker.id, batch.actions)
+    # Уведомления клиентам пишем в outbox в той же транзакции, что и отклики
+    applied = [r["order_id"] for r in results if r["status"] == "applied"]
+    await enqueue_application_notices(session, worker.id, applied)
+    await session.commit()
+    feed_engine.mark_seen(worker.id, [a.order_id for a in batch.actions])
+    if applied:
+        outbox_relay.wake()
+
+    return results
+
+
+# 2.1 ЛАЙК (ОТКЛИКНУТЬСЯ) — одно действие, обертка над пачкой
 @router.post("/api/worker/apply/{order_id}")
 async def apply_order(
     order_id: int,
     price: int, # Рабочий может предложить свою цену
     message: str,
-    authorization: str = Header(..., alias="Authorization"),
+    worker: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    worker = (await session.execute(select(User).where(User.tg_id == user_data["id"]))).scalar_one()
-
-    # Проверяем, не откликался ли уже
-    existing = await session.execute(
-        select(OrderResponse).where(
-            OrderResponse.order_id == order_id, 
-            OrderResponse.worker_id == worker.id
-        )
-    )
-    if existing.scalar_one_or_none():
-        return {"status": "already_exists"}
-
-    response = OrderResponse(
-        order_id=order_id,
-        worker_id=worker.id,
-        proposed_price=price,
-        message=message,
-        is_skipped=False
-    )
-    session.add(response)
+    action = SwipeAction(order_id=order_id, action="apply", price=price, message=message)
+    [result] = await record_swipes(session, worker.id, [action])
+    if result["status"] == "applied":
+        await enqueue_application_notices(session, worker.id, [order_id])
     await session.commit()
-    
-    # ТУТ МОЖНО ОТПРАВИТЬ УВЕДОМЛЕНИЕ КЛИЕНТУ ЧЕРЕЗ БОТА
-    # await bot.send_message(chat_id=client_tg_id, text="На ваш заказ новый отклик!")
+    feed_engine.mark_seen(worker.id, [order_id])
+    outbox_relay.wake()
 
-    return {"status": "applied"}
+    return {"status": result["status"]}
 
 
-# 3. ДИЗЛАЙК (ПРОПУСТИТЬ)
+# 3. ДИЗЛАЙК (ПРОПУСТИТЬ) — одно действие, обертка над пачкой
 @router.post("/api/worker/skip/{order_id}")
 async def skip_order(
     order_id: int,
-    authorization: str = Header(..., alias="Authorization"),
+    worker: TgUser = Depends(get_tg_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    worker = (await session.execute(select(User).where(User.tg_id == user_data["id"]))).scalar_one()
-
-    # Записываем "пустой" отклик с флагом is_skipped
-    response = OrderResponse(
-        order_id=order_id,
-        worker_id=worker.id,
-        is_skipped=True # <-- Важно
-    )
-    session.add(response)
+    action = SwipeAction(order_id=order_id, action="skip")
+    [result] = await record_swipes(session, worker.id, [action])
     await session.commit()
+    feed_engine.mark_seen(worker.id, [order_id])
     
-    return {"status": "skipped"}
+    return {"status": result["status"]}
 
 
-# Добавьте selectinload в импорты
-from sqlalchemy.orm import selectinload
 from sqlalchemy import desc
 
+def active_orders_query(worker_id: int) -> Select:
+    """
+    Ищем заказы:
+    1. Где worker_id совпадает с мастером
+    2. Статус IN_PROGRESS (В работе)
+    3. Контакты мастера — join'ом в том же запросе, строками без ORM-объектов
+    """
+    return (
+        select(
+            *ORDER_DETAIL_COLUMNS,
+            User.name.label("worker_name"), User.phone.label("worker_phone"), User.username.label("worker_username"),
+        )
+        .join(User, User.id == Order.worker_id)
+        .where(
+            Order.worker_id == worker_id,
+            Order.status == OrderStatus.IN_PROGRESS
+        )
+        .order_by(desc(Order.created_at))
+    )
+
+
 @router.get("/api/worker/orders/active", response_model=list[OrderReadDetail])
 async def get_worker_active_orders(
-    authorization: str = Header(..., alias="Authorization"),
-    session: AsyncSession = Depends(get_async_session)
+    worker: TgUser | None = Depends(get_tg_user_optional),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    user_data = validate_telegram_data(authorization, settings.BOT_TOKEN)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    # Ищем самого мастера по tg_id
-    worker_res = await session.execute(select(User).where(User.tg_id == user_data["id"]))
-    worker = worker_res.scalar_one_or_none()
+    # Мастер еще не зарегистрирован — активных заказов нет
     if not worker:
         return []
 
-    # Ищем заказы:
-    # 1. Где worker_id совпадает с мастером
-    # 2. Статус IN_PROGRESS (В работе)
-    # 3. ОБЯЗАТЕЛЬНО подгружаем customer (чтобы видеть телефон клиента)
-    stmt = (
-        select(Order)
-        .where(
-            Order.worker_id == worker.id,
-            Order.status == OrderStatus.IN_PROGRESS
-        )
-        .options(
-            selectinload(Order.customer), 
-            selectinload(Order.worker)    
-        )
-        .order_by(desc(Order.created_at))
-    )
-    
-    result = await session.execute(stmt)
-    orders = result.scalars().all()
-    return orders
\ No newline at end of file
+    result = await session.execute(active_orders_query(worker.id))
+    orders = [
+        {**row, "worker": {"name": row["worker_name"], "phone": row["worker_phone"], "username": row["worker_username"]}}
+        for row in result.mappings()
+    ]
+    return fast_json(list[OrderReadDetail], orders)
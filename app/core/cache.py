@@ -0,0 +1,52 @@
+# app/core/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Маленький LRU-кеш с временем жизни записей (внутри одного процесса).
+    Самые старые по обращению записи вытесняются, когда кеш переполнен.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (expires_at, value); expires_at = None означает "без срока"
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.time():
+            # Протухло — выкидываем
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        """expires_at — абсолютное время (unix). Если не передано, берем ttl кеша."""
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
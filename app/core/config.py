@@ -18,6 +18,34 @@ class Settings(BaseSettings):
     MINIO_Access_Key: str = "minioadmin"
     MINIO_Secret_Key: str = "minioadmin"
     MINIO_Secure: bool = False # False для http (без SSL)
+    # Адрес MinIO для браузера (presigned-ссылки на загрузку и просмотр фото).
+    # Caddy проксирует /order-photos/* на MinIO — см. Caddyfile. Пусто — MINIO_Endpoint
+    MINIO_PUBLIC_ENDPOINT: str = "ustabar.pp.ua"
+    MINIO_PUBLIC_SECURE: bool = True
+    MINIO_REGION: str = "us-east-1"
+    PHOTO_UPLOAD_URL_TTL: int = 300 # Секунд на загрузку по presigned PUT
+    PHOTO_URL_TTL: int = 3600 # Сколько живет ссылка на просмотр фото
+
+    # --- ОБРАБОТКА ФОТО (app/services/images.py) ---
+    # Варианты в WebP рядом с оригиналом: <имя>_thumb.webp, <имя>_md.webp
+    PHOTO_THUMB_SIZE: int = 320 # Превью (сетка, карточка): вписываем в квадрат N x N
+    PHOTO_MEDIUM_SIZE: int = 1280 # Просмотр на весь экран
+    PHOTO_WEBP_QUALITY: int = 80
+    PHOTO_PROCESS_WORKERS: int = 2 # Процессов под Pillow на один app-процесс
+    PHOTO_SWEEP_INTERVAL_SECONDS: int = 60 # Как часто доделывать фото, не обработанные сразу
+
+    # --- ЗАГРУЗКА ФОТО (/api/upload, app/core/storage.py) ---
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_ALLOWED_TYPES: dict[str, str] = {
+        # content-type -> расширение файла в бакете
+        "image/jpeg": "jpg",
+        "image/png": "png",
+        "image/webp": "webp",
+    }
+    UPLOAD_CONCURRENCY: int = 4 # Одновременных потоковых загрузок в MinIO на процесс (поток на каждую)
+    MINIO_CONCURRENCY: int = 8 # Потоков под короткие вызовы minio (stat, copy, remove, листинг) на процесс
+    UPLOAD_PART_SIZE: int = 5 * 1024 * 1024 # Часть multipart upload (S3: минимум 5 МБ)
+    UPLOAD_QUEUE_CHUNKS: int = 16 # Сколько чанков тела держим в памяти на одну загрузку
     # POSTGRES_SERVER: str = "db"
     # POSTGRES_USER: str = "user"
     # POSTGRES_PASSWORD: str = "password"
@@ -38,6 +66,81 @@ class Settings(BaseSettings):
     #     )
     SECRET_KEY: str = "super_secret_key_change_me"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+    # Время жизни токенов (в т.ч. сессий Mini App, см. app/security/session.py)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Telegram initData: сколько секунд она считается свежей и сколько
+    # проверенных строк держим в кеше
+    TG_INIT_DATA_MAX_AGE: int = 86400
+    TG_INIT_DATA_CACHE_SIZE: int = 10_000
+
+    # Кеш tg_id -> юзер (секунды / количество записей)
+    USER_CACHE_TTL: int = 300
+    USER_CACHE_SIZE: int = 10_000
+
+    # --- БАЗА ДАННЫХ (пул соединений на один процесс) ---
+    DB_ECHO: bool = False # True — печатать каждый SQL (только для разработки!)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30 # Сколько секунд ждать свободное соединение
+    DB_POOL_RECYCLE: int = 1800 # Пересоздавать соединения старше N секунд
+    DB_POOL_PRE_PING: bool = True
+    DB_METRICS_ENABLED: bool = True
+
+    # Реплика только для чтения (необязательно). Если не задана — все идет в основную БД
+    DATABASE_REPLICA_URL: str | None = None
+    # Сколько секунд после своей записи юзер читает с основной БД (лаг реплики)
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+
+    # --- ЛЕНТА МАСТЕРА ---
+    FEED_DEFAULT_RADIUS_KM: float = 15
+    FEED_MAX_RADIUS_KM: float = 100
+    # Пулы открытых заказов в памяти (app/services/feed_engine.py)
+    FEED_ENGINE_ENABLED: bool = True
+    FEED_POOL_RESYNC_SECONDS: int = 60 # Полная пересборка пулов из БД
+    FEED_SEEN_CACHE_TTL: int = 600
+    FEED_SEEN_CACHE_SIZE: int = 10_000
+    # SSE-поток событий для мастеров: пинг, чтобы прокси не рвал соединение
+    SSE_HEARTBEAT_SECONDS: int = 15
+
+    # --- УВЕДОМЛЕНИЯ ЧЕРЕЗ БОТА (app/services/notifier.py) ---
+    NOTIFY_NEW_ORDERS: bool = True
+    NOTIFY_RADIUS_KM: float = 15
+    NOTIFY_GLOBAL_RATE: float = 25 # Лимит Telegram ~30/с, оставляем запас
+    NOTIFY_PER_CHAT_RATE: float = 1
+    NOTIFY_CONCURRENCY: int = 4
+    NOTIFY_QUEUE_SIZE: int = 10_000
+    NOTIFY_BATCH_SIZE: int = 500
+    NOTIFY_MAX_RETRIES: int = 3
+
+    # --- OUTBOX СООБЩЕНИЙ БОТА (app/services/outbox.py) ---
+    OUTBOX_POLL_SECONDS: float = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_LEASE_SECONDS: int = 60 # Столько строка "занята" процессом, который ее забрал
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_MAX_BACKOFF_SECONDS: int = 300
+
+    # --- СТАРТ ПРОЦЕССА (app/core/startup.py) ---
+    # Сколько ждем каждый внешний сервис (MinIO, Telegram, БД) при старте
+    STARTUP_TIMEOUT_SECONDS: float = 10
+
+    # --- ФОНОВЫЕ ЗАДАЧИ (app/services/scheduler.py) ---
+    SCHEDULER_ENABLED: bool = True
+    # Заказ в поиске дольше этого — закрываем (EXPIRED) и пишем клиенту
+    ORDER_SEARCH_TTL_HOURS: float = 72
+    ORDER_EXPIRY_INTERVAL_SECONDS: int = 300
+    ORDER_EXPIRY_CHUNK_SIZE: int = 500 # Заказов за одну транзакцию
+    # Помесячные партиции orders / order_responses (app/services/partitions.py)
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_KEEP_MONTHS: int = 12 # Для "archive" по умолчанию
+    PARTITION_CHECK_INTERVAL_SECONDS: int = 24 * 3600
+    # Сборка мусора в бакете фото (app/services/photo_gc.py)
+    PHOTO_GC_GRACE_HOURS: float = 24 # Моложе — не трогаем: фото могли загрузить под еще не созданный заказ
+    PHOTO_GC_INTERVAL_SECONDS: int = 24 * 3600
+    PHOTO_GC_BATCH_SIZE: int = 1000 # Ключей в одном DeleteObjects (S3: максимум 1000)
+    PHOTO_GC_REFS_CHUNK: int = 10_000 # Используемых имен за один запрос к БД (каждый — короткая транзакция)
+
+    # Токен для /api/metrics/* (заголовок X-Metrics-Token). Пусто — эндпоинты выключены
+    METRICS_TOKEN: str = ""
 
 settings = Settings()
\ No newline at end of file
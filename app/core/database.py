@@ -1,11 +1,119 @@
-from sqlalchemy.orm import DeclarativeBase
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import DeclarativeBase, Session
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import create_async_engine,async_sessionmaker,AsyncSession
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.db_metrics import db_metrics, InstrumentedPool
+
+# Настройки пула берем из Settings (см. DB_* в app/core/config.py).
+# Размер пула считаем на ОДИН uvicorn-воркер: всего соединений = воркеры * (pool_size + max_overflow)
+engine_options = dict(
+    echo=settings.DB_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    **engine_options,
+    **({"poolclass": InstrumentedPool} if settings.DB_METRICS_ENABLED else {}),
+)
+
+if settings.DB_METRICS_ENABLED:
+    db_metrics.install(engine.sync_engine)
+
+
+class PrimarySession(Session):
+    """Сессия основной БД. Отдельный класс — чтобы слушать коммиты только здесь."""
+
+
+async_session_maker = async_sessionmaker(engine,expire_on_commit=False,sync_session_class=PrimarySession)
+
+# --- РЕПЛИКА ДЛЯ ЧТЕНИЯ ---
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(settings.DATABASE_REPLICA_URL, **engine_options)
+    replica_session_maker = async_sessionmaker(replica_engine, expire_on_commit=False)
+else:
+    replica_engine = None
+    replica_session_maker = async_session_maker
+
+# Read-your-writes: после своего коммита юзер несколько секунд читает с основной БД,
+# чтобы сразу видеть свои изменения, даже если реплика отстает. Отметок две:
+# - _recent_writes: user_id -> "недавно писал", только внутри этого процесса;
+# - кука RYW_COOKIE с временем коммита: ее видит любой воркер/реплика приложения,
+#   куда бы балансировщик ни отправил следующий GET
+_recent_writes = TTLCache(max_size=100_000, ttl=settings.DB_READ_YOUR_WRITES_SECONDS)
+RYW_COOKIE = "ryw"
+# Куда запомнить время коммита в рамках текущего HTTP-запроса (ставит ReadYourWritesMiddleware)
+_request_writes: ContextVar[dict | None] = ContextVar("request_writes", default=None)
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_write(session: Session) -> None:
+    if replica_engine is None:
+        return
+    # user_id кладет в session.info зависимость get_tg_user (app/api/deps.py)
+    user_id = session.info.get("user_id")
+    if user_id is not None:
+        _recent_writes.set(user_id, True)
+    marker = _request_writes.get()
+    if marker is not None:
+        marker["at"] = time.time()
+
+
+def get_read_session_maker(user_id: int | None = None, wrote_at: str | None = None) -> async_sessionmaker:
+    """
+    Куда читать: реплика, если юзер ничего не писал последние несколько секунд.
+    wrote_at — значение куки RYW_COOKIE (время последнего коммита клиента).
+    """
+    if user_id is not None and _recent_writes.get(user_id):
+        return async_session_maker
+    if wrote_at:
+        try:
+            if time.time() - float(wrote_at) < settings.DB_READ_YOUR_WRITES_SECONDS:
+                return async_session_maker
+        except ValueError:
+            pass
+    return replica_session_maker
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware: если запрос что-то закоммитил в основную БД, отдаем клиенту
+    куку с временем коммита (живет DB_READ_YOUR_WRITES_SECONDS). Без реплики не нужна.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_engine is None:
+            return await self.app(scope, receive, send)
+
+        marker: dict = {}
+        token = _request_writes.set(marker)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and "at" in marker:
+                cookie = (
+                    f"{RYW_COOKIE}={marker['at']:.3f}; Max-Age={settings.DB_READ_YOUR_WRITES_SECONDS}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
 
-engine = create_async_engine(settings.DATABASE_URL,echo = True)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_writes.reset(token)
 
-async_session_maker = async_sessionmaker(engine,expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
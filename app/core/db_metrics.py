@@ -0,0 +1,111 @@
+# app/core/db_metrics.py
+import re
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Границы корзин гистограмм (миллисекунды)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Сколько разных SQL-запросов держим в метриках, остальные идут в "<other>"
+MAX_STATEMENTS = 200
+
+_whitespace = re.compile(r"\s+")
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1) # последняя корзина — "больше всех"
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{b}ms": c for b, c in zip(BUCKETS_MS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class DBMetrics:
+    """
+    Метрики пула и запросов одного движка.
+    checkout_wait — сколько запрос ждал свободное соединение из пула,
+    statements — время выполнения каждого SQL (по тексту запроса).
+    """
+
+    def __init__(self):
+        self.checkout_wait = LatencyHistogram()
+        self.statements: dict[str, LatencyHistogram] = {}
+        self.engine: Engine | None = None
+
+    def observe_statement(self, statement: str, ms: float) -> None:
+        key = _whitespace.sub(" ", statement).strip()[:200]
+        hist = self.statements.get(key)
+        if hist is None:
+            if len(self.statements) >= MAX_STATEMENTS:
+                key = "<other>"
+                hist = self.statements.get(key)
+            if hist is None:
+                hist = self.statements[key] = LatencyHistogram()
+        hist.observe(ms)
+
+    def install(self, engine: Engine) -> None:
+        """Вешаем слушателей на синхронный движок (для async — engine.sync_engine)."""
+        self.engine = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_start"].pop()
+            self.observe_statement(statement, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> dict:
+        pool = {}
+        if self.engine is not None:
+            p = self.engine.pool
+            if isinstance(p, AsyncAdaptedQueuePool):
+                pool = {
+                    "size": p.size(),
+                    "checked_out": p.checkedout(),
+                    "idle": p.checkedin(),
+                    "overflow": p.overflow(),
+                }
+        return {
+            "pool": pool,
+            "checkout_wait": self.checkout_wait.snapshot(),
+            "statements": {k: h.snapshot() for k, h in self.statements.items()},
+        }
+
+
+db_metrics = DBMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Обычный пул asyncpg, который замеряет ожидание свободного соединения."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_metrics.checkout_wait.observe((time.perf_counter() - started) * 1000)
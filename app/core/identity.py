@@ -0,0 +1,33 @@
+# app/core/identity.py
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.auth import TgUser
+
+# tg_id -> TgUser. Кеш живет внутри процесса, поэтому TTL держим коротким:
+# даже без явной инвалидации (другой uvicorn-воркер) данные обновятся сами
+_users = TTLCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+async def get_user_by_tg_id(session: AsyncSession, tg_id: int) -> TgUser | None:
+    """Ищет юзера сначала в кеше, потом в БД. Незарегистрированных не кешируем."""
+    user = _users.get(tg_id)
+    if user is not None:
+        return user
+
+    result = await session.execute(select(User).where(User.tg_id == tg_id))
+    db_user = result.scalar_one_or_none()
+    if db_user is None:
+        return None
+
+    user = TgUser.model_validate(db_user)
+    _users.set(tg_id, user)
+    return user
+
+
+def invalidate_user(tg_id: int) -> None:
+    """Вызываем после изменения профиля (роль, профессия, имя...)."""
+    _users.pop(tg_id)
@@ -0,0 +1,26 @@
+# app/core/pagination.py
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(data: dict) -> str:
+    """Непрозрачный курсор для клиента: base64 от компактного JSON."""
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None, **fields: type) -> dict | None:
+    """
+    Разбирает курсор и приводит поля к нужным типам:
+    decode_cursor(cursor, id=int) -> {"id": 42}. Битый курсор — 400.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return {name: cast(data[name]) for name, cast in fields.items()}
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Неверный курсор")
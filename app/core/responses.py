@@ -0,0 +1,34 @@
+# app/core/responses.py
+"""
+Быстрый ответ для списков.
+
+Обычный путь FastAPI: ORM-объекты -> валидация response_model -> dump в python
+(mode="json") -> json.dumps. Здесь: строки из SQL (dict / RowMapping, без
+ORM-объектов и identity map) -> одна валидация схемой -> JSON-байты сразу из
+pydantic-core (Rust).
+
+Эндпоинт возвращает готовый Response, поэтому FastAPI response_model к нему
+уже не применяет — оставляем его в декораторе только ради OpenAPI.
+"""
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+class PydanticJSONResponse(Response):
+    """Ответ с уже закодированным JSON (bytes)."""
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    # TypeAdapter строит валидатор/сериализатор — дорого, кешируем на тип
+    return TypeAdapter(schema)
+
+
+def fast_json(schema: Any, data: Any, status_code: int = 200) -> PydanticJSONResponse:
+    """fast_json(list[OrderRead], rows) — проверить data схемой и отдать как JSON."""
+    adapter = _adapter(schema)
+    return PydanticJSONResponse(adapter.dump_json(adapter.validate_python(data)), status_code=status_code)
@@ -2,58 +2,112 @@ import hmac
 import hashlib
 import json
 import time
+from functools import lru_cache
 from urllib.parse import parse_qsl
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class TelegramInitDataValidator:
+    """
+    Проверяет initData от Telegram Mini App.
+
+    Секретный ключ (HMAC от токена бота с константой "WebAppData") считается
+    один раз в конструкторе. Уже проверенные строки initData лежат в LRU-кеше:
+    sha256(initData) -> данные юзера. Запись живет, пока initData "свежая"
+    (auth_date + max_age), поэтому повторные запросы не пересчитывают HMAC
+    и не парсят JSON заново.
+    """
+
+    def __init__(self, bot_token: str, max_age: int = 86400, cache_size: int = 10_000):
+        self.max_age = max_age
+        self._secret_key = hmac.new(
+            key=b"WebAppData",
+            msg=bot_token.encode(),
+            digestmod=hashlib.sha256
+        ).digest()
+        self._cache = TTLCache(max_size=cache_size)
+
+    def validate(self, init_data: str) -> dict | bool:
+        """
+        Возвращает объект пользователя или False, если проверка не прошла.
+        """
+        # Ключ кеша — хеш от ВСЕЙ строки, а не поле hash из нее:
+        # иначе можно было бы подменить данные, оставив чужой hash
+        cache_key = hashlib.sha256(init_data.encode()).digest()
+        user_data = self._cache.get(cache_key)
+        if user_data is not None:
+            return user_data
+
+        user_data, auth_date = self._verify(init_data)
+        if not user_data:
+            return False
+
+        # Запись протухнет ровно тогда, когда протухнет сама initData
+        self._cache.set(cache_key, user_data, expires_at=auth_date + self.max_age)
+        return user_data
+
+    def _verify(self, init_data: str) -> tuple[dict | None, int]:
+        try:
+            # 1. Парсим строку запроса (превращаем "a=1&b=2" в словарь)
+            parsed_data = dict(parse_qsl(init_data))
+        except ValueError:
+            return None, 0
+
+        # 2. Достаем хеш, который прислал Телеграм, и удаляем его из данных
+        # (потому что хеш не участвует в создании хеша)
+        received_hash = parsed_data.pop("hash", None)
+        if not received_hash:
+            return None, 0
+
+        # 3. Сортируем ключи по алфавиту (требование Telegram)
+        # И собираем строку вида "auth_date=... \n query_id=... \n user=..."
+        data_check_string = "\n".join(
+            f"{k}={v}" for k, v in sorted(parsed_data.items())
+        )
+
+        # 4. Считаем наш хеш (секретный ключ уже посчитан заранее)
+        calculated_hash = hmac.new(
+            key=self._secret_key,
+            msg=data_check_string.encode(),
+            digestmod=hashlib.sha256
+        ).hexdigest()
+
+        # 5. Сравниваем (безопасное сравнение строк, чтобы защититься от timing attacks)
+        if not hmac.compare_digest(calculated_hash, received_hash):
+            return None, 0
+
+        # 6. Проверка на "свежесть" (защита от повторной отправки старых данных)
+        try:
+            auth_date = int(parsed_data.get("auth_date", 0))
+        except ValueError:
+            return None, 0
+        if time.time() - auth_date > self.max_age:
+            return None, 0
+
+        # 7. Всё ок! Достаем данные юзера из JSON-строки
+        # В parsed_data["user"] лежит строка '{"id": 123, "first_name": "Max"}'
+        if "user" not in parsed_data:
+            return None, 0
+        user_data = json.loads(parsed_data["user"])
+
+        return user_data, auth_date
+
+
+@lru_cache
+def get_validator(bot_token: str) -> TelegramInitDataValidator:
+    """Один валидатор на токен бота — ключ выводится один раз за процесс."""
+    return TelegramInitDataValidator(
+        bot_token,
+        max_age=settings.TG_INIT_DATA_MAX_AGE,
+        cache_size=settings.TG_INIT_DATA_CACHE_SIZE,
+    )
+
+
 def validate_telegram_data(init_data: str, bot_token: str) -> dict | bool:
     """
     Проверяет, что данные пришли от Telegram, и возвращает объект пользователя.
     Если проверка не прошла — возвращает False.
     """
-    try:
-        # 1. Парсим строку запроса (превращаем "a=1&b=2" в словарь)
-        parsed_data = dict(parse_qsl(init_data))
-    except ValueError:
-        return False
-
-    # 2. Достаем хеш, который прислал Телеграм, и удаляем его из данных
-    # (потому что хеш не участвует в создании хеша)
-    received_hash = parsed_data.pop("hash", None)
-    if not received_hash:
-        return False
-
-    # 3. Сортируем ключи по алфавиту (требование Telegram)
-    # И собираем строку вида "auth_date=... \n query_id=... \n user=..."
-    data_check_string = "\n".join(
-        f"{k}={v}" for k, v in sorted(parsed_data.items())
-    )
-
-    # 4. Создаем секретный ключ
-    # Важно: используется константа b"WebAppData", а не просто токен
-    secret_key = hmac.new(
-        key=b"WebAppData", 
-        msg=bot_token.encode(), 
-        digestmod=hashlib.sha256
-    ).digest()
-
-    # 5. Считаем наш хеш
-    calculated_hash = hmac.new(
-        key=secret_key, 
-        msg=data_check_string.encode(), 
-        digestmod=hashlib.sha256
-    ).hexdigest()
-
-    # 6. Сравниваем (безопасное сравнение строк, чтобы защититься от timing attacks)
-    if not hmac.compare_digest(calculated_hash, received_hash):
-        return False
-
-    # 7. Проверка на "свежесть" (защита от повторной отправки старых данных)
-    # Данные валидны только 24 часа (86400 секунд)
-    auth_date = int(parsed_data.get("auth_date", 0))
-    if time.time() - auth_date > 86400:
-        return False
-
-    # 8. Всё ок! Достаем данные юзера из JSON-строки
-    # В parsed_data["user"] лежит строка '{"id": 123, "first_name": "Max"}'
-    user_data = json.loads(parsed_data["user"])
-    
-    return user_data
\ No newline at end of file
+    return get_validator(bot_token).validate(init_data)
@@ -0,0 +1,65 @@
+# app/core/startup.py
+"""
+Старт процесса по фазам с замером времени.
+
+Импорт модулей ничего не делает по сети: MinIO, вебхук Telegram, загрузка
+пулов из БД — в lifespan, параллельно и каждая с таймаутом
+STARTUP_TIMEOUT_SECONDS. Необязательная фаза (MinIO, вебхук) при ошибке или
+таймауте только пишет предупреждение — приложение стартует без нее.
+В конце в лог идет разбивка: сколько заняла каждая фаза.
+"""
+import asyncio
+import time
+from typing import Awaitable
+
+from app.core.config import settings
+
+
+class Startup:
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._last = self._started
+        self.phases: dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        """Синхронная фаза: время с предыдущей отметки (например, импорты)."""
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    async def step(self, name: str, aw: Awaitable, required: bool = True, timeout: float | None = None) -> bool:
+        """Одна фаза с таймаутом. False — необязательная фаза не удалась."""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(aw, timeout or settings.STARTUP_TIMEOUT_SECONDS)
+            return True
+        except Exception as e:
+            if required:
+                print(f"❌ Старт: фаза {name} не удалась: {e!r}")
+                raise
+            print(f"⚠️ Старт: фаза {name} пропущена: {e!r}")
+            return False
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def concurrently(self, name: str, *steps: Awaitable[bool]) -> None:
+        """Независимые фазы (разные внешние сервисы) — одновременно. name — общее время всех."""
+        started = time.perf_counter()
+        await asyncio.gather(*steps)
+        self._last = time.perf_counter()
+        self.phases[name] = self._last - started
+
+    async def sequential(self, name: str, aw: Awaitable) -> None:
+        """Локальная фаза без таймаута (запуск фоновых задач и т.п.)."""
+        started = time.perf_counter()
+        await aw
+        self._last = time.perf_counter()
+        self.phases[name] = self._last - started
+
+    def report(self) -> None:
+        total = time.perf_counter() - self._started
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}мс" for name, seconds in self.phases.items())
+        print(f"⏱ Старт за {total:.2f}с: {parts}")
+
+
+startup = Startup()
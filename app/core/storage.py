@@ -1,5 +1,19 @@
 # app/core/storage.py
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator
+
 from minio import Minio
+from minio.commonconfig import CopySource
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 # Инициализация клиента
@@ -10,31 +24,239 @@ client = Minio(
     secure=settings.MINIO_Secure
 )
 
+# Клиент только для подписи ссылок (presigned): адрес MinIO, каким его видит браузер.
+# Подпись считается локально; region задан явно, иначе minio сходит узнать его по сети
+public_client = Minio(
+    settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_Endpoint,
+    access_key=settings.MINIO_Access_Key,
+    secret_key=settings.MINIO_Secret_Key,
+    secure=settings.MINIO_PUBLIC_SECURE if settings.MINIO_PUBLIC_ENDPOINT else settings.MINIO_Secure,
+    region=settings.MINIO_REGION,
+)
+
 BUCKET_NAME = "order-photos"
+# Недокачанные / еще не переименованные загрузки через /api/upload (см. rename_object)
+TMP_PREFIX = "tmp/"
 
+# Ссылки на просмотр: одна и та же ссылка на фото живет половину PHOTO_URL_TTL,
+# так что браузер (и Telegram WebView) кеширует и саму картинку
+_photo_urls = TTLCache(max_size=10_000, ttl=settings.PHOTO_URL_TTL / 2)
 
-def init_storage():
-    """Безопасная инициализация бакета"""
-    try:
+
+class _QueueReader:
+    """
+    Файлоподобный объект для put_object: read() вызывается в потоке и ждет
+    чанки, которые event loop кладет в asyncio.Queue. None в очереди — конец файла.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self._queue = queue
+        self._loop = loop
+        self._buffer = b""
+        self._eof = False
+        self._error: BaseException | None = None
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer and not self._eof:
+            chunk = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if self._error is not None:
+                raise self._error
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        # Отдаем сколько есть — minio сам дочитывает часть до part_size
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def abort(self, error: BaseException) -> None:
+        """Вызывается из event loop: следующий read() в потоке упадет, minio отменит загрузку."""
+        self._error = error
+        try:
+            self._queue.put_nowait(None) # Будим поток, если он ждет чанк
+        except asyncio.QueueFull:
+            pass # Очередь полна — значит, поток не ждет и скоро сам прочитает
+
+
+# Синхронный minio крутим в своих пулах, чтобы не отъедать потоки у остального run_in_executor.
+# Потоковая загрузка держит поток, пока клиент шлет тело (медленный клиент — минуты),
+# поэтому у загрузок свой пул: UPLOAD_CONCURRENCY медленных загрузок не блокируют
+# stat/copy/remove и листинг, которые идут через _minio_pool
+_upload_pool = ThreadPoolExecutor(max_workers=settings.UPLOAD_CONCURRENCY, thread_name_prefix="minio-upload")
+_minio_pool = ThreadPoolExecutor(max_workers=settings.MINIO_CONCURRENCY, thread_name_prefix="minio")
+
+
+async def init_storage():
+    """Безопасная инициализация бакета (из lifespan, в потоке — event loop не ждет MinIO)"""
+    def _init():
         if not client.bucket_exists(BUCKET_NAME):
             client.make_bucket(BUCKET_NAME)
             print(f"✅ Бакет {BUCKET_NAME} создан")
         else:
             print(f"👌 Бакет {BUCKET_NAME} уже существует")
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_minio_pool, _init)
     except Exception as e:
         print(f"❌ Ошибка подключения к MinIO: {e}")
-        
-async def upload_file_to_minio(file_data, filename, content_type):
-    """Загружает файл и возвращает имя"""
-    # Важно: stream нужно читать, file_data - это SpooledTemporaryFile
-    size = file_data.seek(0, 2) # Узнаем размер
-    file_data.seek(0)
-    
-    client.put_object(
+
+
+async def stream_to_minio(chunks: AsyncIterator[bytes], filename: str, content_type: str) -> str:
+    """
+    Потоково заливает файл в MinIO, не блокируя event loop.
+    Чанки идут через ограниченную очередь (backpressure: клиент не обгонит MinIO
+    больше чем на UPLOAD_QUEUE_CHUNKS чанков), а put_object с length=-1 в потоке
+    режет поток на части по UPLOAD_PART_SIZE (multipart upload).
+    Исключение в chunks (например, превышен размер) отменяет загрузку.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.UPLOAD_QUEUE_CHUNKS)
+    reader = _QueueReader(queue, loop)
+    upload = loop.run_in_executor(_upload_pool, partial(
+        client.put_object,
         BUCKET_NAME,
         filename,
-        file_data,
-        size,
-        content_type=content_type
+        reader,
+        length=-1,
+        part_size=settings.UPLOAD_PART_SIZE,
+        content_type=content_type,
+    ))
+
+    try:
+        async for chunk in chunks:
+            put = asyncio.ensure_future(queue.put(chunk))
+            await asyncio.wait({put, upload}, return_when=asyncio.FIRST_COMPLETED)
+            if not put.done():
+                # Поток загрузки уже завершился (ошибка MinIO) — ниже upload ее поднимет
+                put.cancel()
+                break
+        else:
+            await queue.put(None)
+        await upload
+    except BaseException as e:
+        reader.abort(e)
+        # Ошибку потока забираем сами, чтобы не было "exception was never retrieved"
+        upload.add_done_callback(lambda f: f.cancelled() or f.exception())
+        raise
+    return filename
+
+
+def variant_name(filename: str, variant: str) -> str:
+    """Ключ WebP-варианта рядом с оригиналом: 'abc.jpg', 'thumb' -> 'abc_thumb.webp'."""
+    return f"{filename.rsplit('.', 1)[0]}_{variant}.webp"
+
+
+def presigned_upload_url(object_name: str) -> str:
+    """Короткая ссылка, по которой браузер сам кладет файл в бакет (PUT)."""
+    return public_client.presigned_put_object(
+        BUCKET_NAME, object_name, expires=timedelta(seconds=settings.PHOTO_UPLOAD_URL_TTL)
     )
-    return filename
\ No newline at end of file
+
+
+def presigned_photo_url(object_name: str) -> str:
+    """Ссылка на просмотр (GET). Закешированная — минимум на PHOTO_URL_TTL / 2 еще живая."""
+    url = _photo_urls.get(object_name)
+    if url is None:
+        url = public_client.presigned_get_object(
+            BUCKET_NAME, object_name, expires=timedelta(seconds=settings.PHOTO_URL_TTL)
+        )
+        _photo_urls.set(object_name, url)
+    return url
+
+
+async def stat_object(object_name: str) -> Object:
+    """Метаданные объекта (размер, тип, etag). Нет объекта — minio.error.S3Error."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_minio_pool, client.stat_object, BUCKET_NAME, object_name)
+
+
+async def remove_object(object_name: str) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_minio_pool, client.remove_object, BUCKET_NAME, object_name)
+
+
+async def get_object_bytes(object_name: str) -> bytes:
+    """Скачивает объект целиком (только для небольших файлов — фото до UPLOAD_MAX_BYTES)."""
+    def _read() -> bytes:
+        response = client.get_object(BUCKET_NAME, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_minio_pool, _read)
+
+
+async def put_object_bytes(object_name: str, data: bytes, content_type: str) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_minio_pool, partial(
+        client.put_object, BUCKET_NAME, object_name, io.BytesIO(data), len(data), content_type=content_type,
+    ))
+
+
+async def object_exists(object_name: str) -> bool:
+    try:
+        await stat_object(object_name)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return False
+        raise
+    return True
+
+
+async def object_sha256(object_name: str) -> str:
+    """SHA-256 объекта (hex), читаем из MinIO потоком — целиком в память не грузим."""
+    def _hash() -> str:
+        response = client.get_object(BUCKET_NAME, object_name)
+        try:
+            digest = hashlib.sha256()
+            for chunk in response.stream(64 * 1024):
+                digest.update(chunk)
+            return digest.hexdigest()
+        finally:
+            response.close()
+            response.release_conn()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_minio_pool, _hash)
+
+
+async def rename_object(source: str, target: str) -> None:
+    """Копия внутри MinIO (байты не идут через нас) + удаление исходного."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_minio_pool, partial(
+        client.copy_object, BUCKET_NAME, target, CopySource(BUCKET_NAME, source),
+    ))
+    await remove_object(source)
+
+
+async def iter_objects(page_size: int = 1000) -> AsyncIterator[list[Object]]:
+    """
+    Весь бакет пачками по page_size, в порядке ключей (S3 отдает листинг
+    отсортированным). minio сам ходит за следующими страницами — в памяти
+    одна пачка, сколько бы объектов ни было.
+    """
+    objects = client.list_objects(BUCKET_NAME, recursive=True)
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await loop.run_in_executor(_minio_pool, lambda: list(islice(objects, page_size)))
+        if not batch:
+            return
+        yield batch
+
+
+async def remove_objects(object_names: list[str]) -> list[str]:
+    """Удаление пачкой (DeleteObjects, до 1000 ключей за запрос). Возвращает ключи, которые не удалились."""
+    def _remove() -> list[str]:
+        # remove_objects ленивый: запросы уходят, пока читаем ошибки
+        errors = client.remove_objects(BUCKET_NAME, [DeleteObject(name) for name in object_names])
+        return [error.name for error in errors]
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_minio_pool, _remove)
@@ -10,6 +10,7 @@ from sqlalchemy import select
 from app.core.database import async_session_maker 
 from app.models.user import User
 from app.core.config import settings
+from app.core.identity import invalidate_user
 import time
 
 user_router = Router()
@@ -166,6 +167,9 @@ async def process_phone(message: Message, state: FSMContext, bot: Bot):
             await session.commit()
             await session.refresh(user)
 
+    # Профиль поменялся — сбрасываем закешированную копию для API
+    invalidate_user(user.tg_id)
+
     # Вместо того чтобы дублировать код меню, вызываем нашу функцию!
     # message отправляем тот, который есть, user передаем из БД
     await show_main_menu(message, state, user)
@@ -3,6 +3,21 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from app.core.config import settings
 
-# Инициализируем бота и диспетчер здесь
-bot = Bot(token=settings.BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
\ No newline at end of file
+# Диспетчер нужен сразу (к нему цепляются роутеры), а бота создаем при первом
+# обращении — из lifespan, а не при импорте модуля
+dp = Dispatcher(storage=MemoryStorage())
+_bot: Bot | None = None
+
+
+def get_bot() -> Bot:
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=settings.BOT_TOKEN)
+    return _bot
+
+
+async def close_bot() -> None:
+    global _bot
+    if _bot is not None:
+        await _bot.session.close()
+        _bot = None
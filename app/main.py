@@ -1,41 +1,114 @@
+import asyncio
 from contextlib import asynccontextmanager
+
+# Первым: отсюда считается время старта (импорты — тоже фаза)
+from app.core.startup import startup
+
 from fastapi import FastAPI, Request
 from aiogram import types
 
 # ИМПОРТИРУЕМ ИЗ LOADER
-from app.loader import bot, dp 
+from app.loader import dp, get_bot, close_bot
 
 # Роутеры
 from app.api.page_router import router as page_router
 from app.core.config import settings
+from app.core.database import ReadYourWritesMiddleware
+from app.core.security_tg import get_validator
 from app.handlers.user import user_router 
 from app.api.upload_router import router as upload_router
+from app.api.photo_router import router as photo_router
 from app.core.storage import init_storage
 from app.api.order_router import router as order_router
 from app.api.worker_router import router as worker_router
-
-init_storage()
+from app.api.auth.telegram import router as tg_auth_router
+from app.security.session import sessions_enabled
+from app.api.metrics_router import router as metrics_router
+from app.services.feed_engine import feed_engine
+from app.services.event_hub import event_hub
+from app.services.notifier import bot_dispatcher
+from app.services.outbox import outbox_relay
+from app.services.scheduler import scheduler
+from app.services.images import photo_processor
+from app.services import expiry # noqa: F401 — регистрирует задачу и хук перехода в EXPIRED
+from app.services import partitions # noqa: F401 — задача "партиции на месяцы вперед"
+from app.services import photo_gc # noqa: F401 — задача "мусор в бакете фото"
 
 # Подключаем роутеры бота к диспетчеру (это можно оставить здесь)
 dp.include_router(user_router)
 
+# Ничего сетевого при импорте: бакет, вебхук и т.п. — в lifespan
+startup.mark("imports")
+
+
+async def _set_webhook() -> None:
+    webhook_url = settings.BASE_URL + settings.WEBHOOK_PATH
+    print(f"🚀 Устанавливаем вебхук: {webhook_url}")
+    await get_bot().set_webhook(url=webhook_url)
+
+
+async def _start_events() -> None:
+    # Пулы кандидатов для ленты мастеров (в памяти процесса)
+    if settings.FEED_ENGINE_ENABLED:
+        event_hub.add_listener(feed_engine.on_event, on_reconnect=feed_engine.reload)
+        await startup.step("feed_engine", feed_engine.start(), required=False)
+
+    # События по заказам между процессами (LISTEN/NOTIFY) и SSE для мастеров
+    await event_hub.start()
 
-# --- Жизненный цикл (ОСТАЕТСЯ БЕЗ ИЗМЕНЕНИЙ) ---
+
+async def _start_workers() -> None:
+    # Очередь сообщений бота (уведомления мастерам) с лимитами Telegram
+    await bot_dispatcher.start()
+    await outbox_relay.start()
+
+    # Превью и WebP-варианты фото (Pillow в пуле процессов)
+    await photo_processor.start()
+
+    # Периодические задачи (протухание заказов и т.п.), между процессами — advisory lock
+    if settings.SCHEDULER_ENABLED:
+        await scheduler.start()
+
+
+# --- Жизненный цикл ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. ДЕЙСТВИЯ ПРИ ЗАПУСКЕ
-    webhook_url = settings.BASE_URL + settings.WEBHOOK_PATH
-    print(f"🚀 Устанавливаем вебхук: {webhook_url}")
-    
-    # bot импортирован из loader, но работает так же
-    await bot.set_webhook(url=webhook_url)
+    # Считаем секретный ключ для проверки initData один раз, до первых запросов
+    get_validator(settings.BOT_TOKEN)
+    if not sessions_enabled():
+        print("⚠️ SECRET_KEY не задан — токены сессий Mini App выключены, авторизация только по initData")
+    startup.mark("tg_validator")
+
+    # Внешние сервисы друг от друга не зависят — ждем их одновременно, каждый
+    # не дольше STARTUP_TIMEOUT_SECONDS. Без MinIO и вебхука (Telegram помнит
+    # старый) приложение все равно поднимается
+    await startup.concurrently(
+        "external",
+        startup.step("storage", init_storage(), required=False),
+        startup.step("webhook", _set_webhook(), required=False),
+        # Партиции на месяцы вперед — сразу, а не через PARTITION_CHECK_INTERVAL_SECONDS
+        startup.step("partitions", scheduler.run_now("ensure_partitions"), required=False),
+        _start_events(),
+    )
+    await startup.sequential("workers", _start_workers())
+    startup.report()
     
     yield 
     
     # 2. ДЕЙСТВИЯ ПРИ ВЫКЛЮЧЕНИИ
+    await scheduler.stop()
+    await photo_processor.stop()
+    await outbox_relay.stop()
+    await bot_dispatcher.stop()
+    await event_hub.stop()
+    await feed_engine.stop()
     print("🛑 Удаляем вебхук...")
-    await bot.delete_webhook()
-    await bot.session.close()
+    try:
+        await asyncio.wait_for(get_bot().delete_webhook(), settings.STARTUP_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"⚠️ Вебхук не удален: {e!r}")
+    await close_bot()
 
 
 app = FastAPI(
@@ -43,14 +116,20 @@ app = FastAPI(
     lifespan=lifespan 
 )
 
+# Кука "недавно писал" — чтобы следующий GET в любом процессе читал с основной БД
+app.add_middleware(ReadYourWritesMiddleware)
+
+app.include_router(tg_auth_router)
 app.include_router(order_router)
 app.include_router(worker_router)
 app.include_router(page_router)
 app.include_router(upload_router)
+app.include_router(photo_router)
+app.include_router(metrics_router)
 
 # Вебхук хендлер
 @app.post(settings.WEBHOOK_PATH)
 async def bot_webhook(request: Request):
     telegram_update = await request.json()
     update = types.Update(**telegram_update)
-    await dp.feed_update(bot=bot, update=update)
\ No newline at end of file
+    await dp.feed_update(bot=get_bot(), update=update)
\ No newline at end of file
@@ -1,9 +1,9 @@
 import enum
 from datetime import datetime
 from typing import Optional, Any
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Text, Enum, JSON,Boolean
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.sql import func
+from sqlalchemy import String, Integer, ForeignKey, ForeignKeyConstraint, DateTime, Text, Enum, JSON,Boolean,Index, Float
+from sqlalchemy.orm import Mapped, mapped_column, relationship, column_property
+from sqlalchemy.sql import func, text
 from geoalchemy2 import Geometry # pip install geoalchemy2
 
 from app.core.database import Base
@@ -14,12 +14,15 @@ class OrderStatus(str, enum.Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     CANCELED = "canceled"
+    EXPIRED = "expired" # Долго никто не брался — закрыт автоматически (app/services/expiry.py)
 
 class Order(Base):
     __tablename__ = "orders"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    # Таблица партиционирована по created_at (помесячно, app/services/partitions.py),
+    # поэтому ключ партиции входит в первичный ключ. id по-прежнему уникален (sequence)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(primary_key=True, server_default=func.now())
     
     # Клиент (Владелец заказа)
     customer_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -36,7 +39,7 @@ class Order(Base):
         back_populates="worker_orders" # Имя связи в модели User (см. шаг 2)
     )
     # Детали заказа
-    service_type: Mapped[str] = mapped_column(String, index=True) # electrician
+    service_type: Mapped[str] = mapped_column(String) # electrician (индекс — см. __table_args__)
     price: Mapped[int] = mapped_column(Integer) # Бюджет
     duration: Mapped[str] = mapped_column(String) # "2 часа"
     comment: Mapped[Optional[str]] = mapped_column(Text)
@@ -47,9 +50,51 @@ class Order(Base):
     # --- ГЕОЛОКАЦИЯ (PostGIS) ---
     # Используем тип Geometry. В Pydantic это будет отображаться как str или bytes при чтении
     location: Mapped[Any] = mapped_column(Geometry("POINT", srid=4326))
+    # Координаты для API считает Postgres в том же SELECT (ST_Y/ST_X),
+    # без разбора WKB через Shapely на каждый заказ. Только для чтения
+    lat: Mapped[float] = column_property(func.ST_Y(location, type_=Float))
+    lon: Mapped[float] = column_property(func.ST_X(location, type_=Float))
     address: Mapped[str] = mapped_column(String)
 
     status: Mapped[OrderStatus] = mapped_column(default=OrderStatus.SEARCHING)
+    __table_args__ = (
+        # Частичные индексы по status = 'SEARCHING' работают, только если статус
+        # в запросе литерал, а не параметр — см. searching() в app/services/order_states.py
+
+        # Для протухания заказов: только открытые, по возрасту
+        Index(
+            "idx_orders_searching_created", "created_at",
+            postgresql_where=text("status = 'SEARCHING'"),
+        ),
+        # Лента без координат: открытые заказы профессии, новые сверху
+        Index(
+            "idx_orders_searching_service", "service_type", text("id DESC"),
+            postgresql_where=text("status = 'SEARCHING'"),
+        ),
+        # Лента "сначала ближайшие": ST_DWithin и KNN по geography(location)
+        Index(
+            "idx_orders_searching_geog", text("geography(location)"),
+            postgresql_using="gist",
+            postgresql_where=text("status = 'SEARCHING'"),
+        ),
+        # "Мои заказы": покрывающий индекс под OrderRead (index-only scan)
+        Index(
+            "idx_orders_customer_created", "customer_id", text("created_at DESC"),
+            postgresql_include=["id", "service_type", "price", "status", "address"],
+        ),
+        # "Мои работы" мастера: worker_id + статус
+        Index(
+            "idx_orders_worker_status", "worker_id", "status", text("created_at DESC"),
+            postgresql_where=text("worker_id IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Версия строки (optimistic concurrency): каждый UPDATE через ORM добавляет
+    # "AND version = <прочитанная>" и падает со StaleDataError, если заказ
+    # успели изменить параллельно. Ручные UPDATE увеличивают ее сами
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     # Отклики от рабочих (One-to-Many)
     responses: Mapped[list["OrderResponse"]] = relationship(back_populates="order")
@@ -58,12 +103,30 @@ class Order(Base):
 # --- Таблица откликов (Рабочий -> Заказ) ---
 class OrderResponse(Base):
     __tablename__ = "order_responses"
+    __table_args__ = (
+        # Отклики на заказ (без пропусков) — для страницы заказа клиента
+        Index(
+            "idx_order_responses_applications", "order_id", "order_created_at",
+            postgresql_where=text("NOT is_skipped"),
+        ),
+        # Один мастер — одна реакция на заказ. Этот же индекс держит NOT EXISTS в ленте.
+        # order_created_at однозначно задается order_id, но уникальный индекс
+        # партиционированной таблицы обязан включать ключ партиции
+        Index("uq_order_responses_worker_order", "worker_id", "order_id", "order_created_at", unique=True),
+        ForeignKeyConstraint(
+            ["order_id", "order_created_at"], ["orders.id", "orders.created_at"],
+            name="fk_order_responses_order",
+        ),
+        # Те же месячные границы, что у orders: отклики лежат рядом со своим заказом
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
-    # К какому заказу отклик
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"))
+    # К какому заказу отклик (заказ определяется парой id + created_at)
+    order_id: Mapped[int] = mapped_column(Integer)
+    order_created_at: Mapped[datetime] = mapped_column(primary_key=True)
     order: Mapped["Order"] = relationship(back_populates="responses")
 
     # Какой рабочий откликнулся
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, JSON, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+# --- Исходящие сообщения бота (transactional outbox) ---
+# Хендлер пишет строку в той же транзакции, что и изменение заказа,
+# а отправляет ее фоновый OutboxRelay (app/services/outbox.py)
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # Релей ищет только неотправленные — частичный индекс остается маленьким
+        Index(
+            "idx_outbox_pending", "available_at",
+            postgresql_where=text("sent_at IS NULL AND failed_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    # Кому и что
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text)
+    parse_mode: Mapped[Optional[str]] = mapped_column(String)
+    reply_markup: Mapped[Optional[dict]] = mapped_column(JSON) # InlineKeyboardMarkup в виде dict
+
+    # Доставка: не раньше available_at; попытки с растущей паузой
+    available_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime) # Сдались (бот заблокирован и т.п.)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
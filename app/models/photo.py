@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Text, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+# --- Загруженные фото ---
+# Браузер кладет файл в MinIO сам (presigned PUT), а строка появляется, когда
+# клиент подтвердил загрузку (POST /api/photos/finalize) и мы проверили объект.
+# Имя объекта — sha256 содержимого: одинаковые фото хранятся один раз
+class Photo(Base):
+    __tablename__ = "photos"
+    __table_args__ = (
+        # Фоновая доработка ищет только необработанные — индекс остается маленьким
+        Index(
+            "idx_photos_unprocessed", "created_at",
+            postgresql_where=text("processed_at IS NULL AND process_error IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    # Ключ в бакете (app/core/storage.py: BUCKET_NAME): <sha256>.<расширение>
+    # (у загруженных до content addressing — <uuid4>.<расширение>)
+    object_name: Mapped[str] = mapped_column(String, unique=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+
+    content_type: Mapped[str] = mapped_column(String)
+    size: Mapped[int] = mapped_column(Integer) # Байты
+    etag: Mapped[str] = mapped_column(String)
+
+    # Последний раз фото отдали клиенту как "уже есть" (дедупликация) или записали.
+    # photo_gc не трогает фото моложе PHOTO_GC_GRACE_HOURS по этой отметке: клиент
+    # вот-вот сошлется на него в create_order
+    last_used_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    # Превью и WebP-варианты (app/services/images.py): когда готовы / почему не вышло
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    process_error: Mapped[Optional[str]] = mapped_column(Text)
+
+
+# --- Какие фото в каких заказах (счетчик ссылок) ---
+# Одно фото может быть в нескольких заказах (повторная отправка формы и т.п.).
+# Фото без строк здесь — кандидат на удаление из бакета.
+# FK на orders нет намеренно: он мешал бы отцеплять старые партиции orders
+# (app/services/partitions.py), а фото архивных заказов просто остаются со ссылкой
+class OrderPhoto(Base):
+    __tablename__ = "order_photos"
+
+    order_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    photo_id: Mapped[int] = mapped_column(ForeignKey("photos.id"), primary_key=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
@@ -1,10 +1,15 @@
 from sqlalchemy import String, Boolean
 from sqlalchemy.orm import Mapped, mapped_column,relationship
 from app.core.database import Base
-from sqlalchemy import String, Boolean, BigInteger, ForeignKey,Float
-from typing import Optional,List
+from sqlalchemy import String, Boolean, BigInteger, ForeignKey,Float, Index, text
+from typing import Optional,List,Any
+from geoalchemy2 import Geometry
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Рассылка новых заказов: мастера нужной профессии, пачками по id
+        Index("idx_users_workers_by_service", "service_type", "id", postgresql_where=text("role = 'worker'")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     
@@ -73,6 +78,12 @@ class WorkerProfile(Base):
     description: Mapped[Optional[str]] = mapped_column(String) # О себе
     company_name: Mapped[Optional[str]] = mapped_column(String)
     rating: Mapped[float] = mapped_column(Float, default=5.0)
+
+    # "Домашняя" точка мастера: по ней строится лента "сначала ближайшие",
+    # если приложение не прислало GPS
+    home_location: Mapped[Optional[Any]] = mapped_column(
+        Geometry("POINT", srid=4326, spatial_index=False), nullable=True
+    )
     
     # Можно хранить список ссылок на фото работ (портфолио)
     # В PG это можно делать через ARRAY или JSON
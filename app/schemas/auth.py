@@ -0,0 +1,21 @@
+# app/schemas/auth.py
+from pydantic import BaseModel
+
+
+class TgUser(BaseModel):
+    """Легкая неизменяемая копия юзера для API (без ORM и сессии)."""
+    id: int
+    tg_id: int
+    role: str
+    service_type: str | None = None
+    name: str | None = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class SessionToken(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: int # unix-время, когда токен протухнет
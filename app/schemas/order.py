@@ -1,9 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field, field_validator
 from typing import Optional,List
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
-from app.models.order import OrderStatus
+from app.models.order import Order, OrderStatus
+from app.schemas.photo import PhotoUrls
+from app.services.photos import PHOTO_NAME_RE
 
 
 class WorkerContact(BaseModel):
@@ -22,6 +24,22 @@ class OrderCreate(BaseModel):
     longitude: float
     photos: Optional[str] = None # Приходит строка "img1.jpg,img2.jpg"
 
+    @field_validator("photos")
+    @classmethod
+    def check_photo_names(cls, value: Optional[str]) -> Optional[str]:
+        # Имена потом попадают в ссылки и в разметку ленты — пускаем только
+        # ключи оригиналов из бакета (хеш/uuid + расширение), без вариантов
+        for name in value.split(",") if value else []:
+            match = PHOTO_NAME_RE.match(name)
+            if match is None or match[2] is not None:
+                raise ValueError(f"Некорректное имя фото: {name[:80]!r}")
+        return value
+
+
+class HomeLocation(BaseModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
 
 class OrderRead(BaseModel):
     id: int
@@ -36,15 +54,14 @@ class OrderRead(BaseModel):
         # Эта настройка разрешает Pydantic читать данные из ORM-моделей
         from_attributes = True
 
-# Схема для ДЕТАЛЬНОГО просмотра
-from pydantic import BaseModel, field_validator
-from datetime import datetime
-from typing import Optional, List, Any
-from app.models.order import OrderStatus
-from geoalchemy2.shape import to_shape # Нужно для конвертации
-
-# ... твои прошлые схемы ...
+# Колонки под OrderRead / OrderReadDetail: списки выбираем строками, без ORM-объектов
+# (см. app/core/responses.py). Добавили поле в схему — добавьте колонку сюда
+ORDER_READ_COLUMNS = (Order.id, Order.service_type, Order.price, Order.status, Order.address, Order.created_at)
+ORDER_DETAIL_COLUMNS = ORDER_READ_COLUMNS + (
+    Order.duration, Order.comment, Order.photos, Order.version, Order.lat, Order.lon,
+)
 
+# Схема для ДЕТАЛЬНОГО просмотра
 # Обновляем схему детализации (которая используется в фиде)
 class OrderReadDetail(BaseModel):
     id: int
@@ -57,25 +74,27 @@ class OrderReadDetail(BaseModel):
     comment: Optional[str] = None
     photos: Optional[List[str]] = []
     worker: Optional[WorkerContact] = None
+    # Версия заказа: передайте в accept, чтобы не перезаписать чужое изменение
+    version: int = 1
     
-    # Добавляем поля координат
+    # Координаты — column_property Order.lat / Order.lon (ST_Y / ST_X в SQL)
     lat: float
     lon: float
 
+    # Расстояние до мастера (только в ленте, когда известны его координаты)
+    distance_km: Optional[float] = None
+
     class Config:
         from_attributes = True
 
-    # Проще сделать через model_validator, чтобы разобрать объект Order целиком
-    from pydantic import model_validator
+    # Ссылки на оригинал и WebP-варианты для каждого фото из photos
+    @computed_field
+    @property
+    def photo_urls(self) -> List[PhotoUrls]:
+        return [PhotoUrls.for_file(name) for name in self.photos or []]
 
-    @model_validator(mode='before')
-    @classmethod
-    def extract_coords(cls, data: Any) -> Any:
-        # data - это объект SQLAlchemy Order
-        if hasattr(data, "location") and data.location is not None:
-            # Превращаем WKBElement (PostGIS) в объект Shapely
-            shapely_point = to_shape(data.location)
-            # Добавляем атрибуты динамически, чтобы Pydantic их съел
-            data.lat = shapely_point.y # Latitude
-            data.lon = shapely_point.x # Longitude
-        return data
\ No newline at end of file
+
+class OrderFeedPage(BaseModel):
+    items: List[OrderReadDetail]
+    # Передайте в ?cursor=, чтобы получить следующую страницу. None — заказов больше нет
+    next_cursor: Optional[str] = None
@@ -0,0 +1,52 @@
+# app/schemas/photo.py
+from typing import Optional
+from pydantic import BaseModel, Field
+
+from app.core.storage import variant_name
+
+
+def photo_url(filename: str) -> str:
+    """Постоянный адрес фото для фронта (редиректит на MinIO, см. app/api/photo_router.py)."""
+    return f"/api/photos/{filename}"
+
+
+class PhotoUploadRequest(BaseModel):
+    content_type: str # image/jpeg, image/png...
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$") # Хеш файла (hex) — он же имя объекта
+
+
+class PhotoUploadTicket(BaseModel):
+    filename: str
+    # PUT сюда сам файл с тем же Content-Type, потом POST /api/photos/finalize.
+    # None — такое фото уже есть в хранилище, загружать не нужно (сразу finalize)
+    upload_url: Optional[str] = None
+    # Временный ключ, на который смотрит upload_url — передайте его в finalize
+    upload_key: Optional[str] = None
+    expires_in: int # Секунды
+
+
+class PhotoFinalize(BaseModel):
+    filename: str = Field(pattern=r"^[0-9a-f]{64}\.[a-z0-9]{2,5}$")
+    upload_key: Optional[str] = Field(None, pattern=r"^tmp/[0-9a-f]{32}$")
+
+
+class PhotoRead(BaseModel):
+    filename: str
+    url: str
+    content_type: str
+    size: int
+    deduplicated: bool = False # Байты не передавались — фото уже было
+
+
+class PhotoUrls(BaseModel):
+    original: str
+    thumb: str # Превью для сетки / карточки (WebP)
+    md: str # Просмотр на весь экран (WebP)
+
+    @classmethod
+    def for_file(cls, filename: str) -> "PhotoUrls":
+        return cls(
+            original=photo_url(filename),
+            thumb=photo_url(variant_name(filename, "thumb")),
+            md=photo_url(variant_name(filename, "md")),
+        )
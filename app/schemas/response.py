@@ -15,4 +15,25 @@ class ApplicationRead(BaseModel):
     worker: WorkerShortInfo # Вложенный объект с инфой о мастере
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- СВАЙПЫ МАСТЕРА (пачкой) ---
+from typing import List, Literal
+from pydantic import Field
+
+class SwipeAction(BaseModel):
+    order_id: int
+    action: Literal["skip", "apply"]
+    price: Optional[int] = None # Только для "apply": цена мастера
+    message: Optional[str] = None
+    # Ключ от клиента: по нему клиент сопоставляет результаты при ретраях
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+class SwipeBatch(BaseModel):
+    actions: List[SwipeAction] = Field(min_length=1, max_length=50)
+
+class SwipeResult(BaseModel):
+    order_id: int
+    idempotency_key: Optional[str] = None
+    # applied / skipped — записали; already_exists — уже было; unavailable — заказ закрыт или не найден
+    status: str
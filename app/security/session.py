@@ -0,0 +1,49 @@
+# app/security/session.py
+import time
+
+from app.core.config import Settings, settings
+from app.schemas.auth import TgUser
+from app.security.jwt import create_access_token, decode_access_token
+
+# Отличаем токен сессии Mini App от токенов логина по паролю
+TOKEN_TYPE = "tg_session"
+
+
+def sessions_enabled() -> bool:
+    """
+    SECRET_KEY не задан (значение по умолчанию из кода) — токен сессии может
+    подписать кто угодно. Тогда токены не выпускаем и не принимаем: Mini App
+    ходит с initData, которую проверяем по BOT_TOKEN.
+    """
+    return settings.SECRET_KEY != Settings.model_fields["SECRET_KEY"].default
+
+
+def create_session_token(user: TgUser) -> tuple[str, int]:
+    """
+    Выпускает подписанный токен сессии Mini App.
+    В токене только кто это (id + tg_id). Роль, профессия и имя меняются
+    (регистрация мастера и т.п.), поэтому их берем из кеша юзеров
+    (app/core/identity.py), а не из токена, который живет до истечения.
+    Возвращает (токен, unix-время истечения).
+    """
+    expires_at = int(time.time()) + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token = create_access_token({
+        "sub": str(user.id),
+        "typ": TOKEN_TYPE,
+        "tg_id": user.tg_id,
+    })
+    return token, expires_at
+
+
+def decode_session_token(token: str) -> tuple[int, int] | None:
+    """Проверяет подпись и срок токена -> (id, tg_id). None — если токен битый или чужой."""
+    if not sessions_enabled():
+        return None
+    payload = decode_access_token(token)
+    if not payload or payload.get("typ") != TOKEN_TYPE:
+        return None
+
+    try:
+        return int(payload["sub"]), int(payload["tg_id"])
+    except (KeyError, ValueError, TypeError):
+        return None
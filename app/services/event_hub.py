@@ -0,0 +1,132 @@
+# app/services/event_hub.py
+import asyncio
+import json
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import select, func, cast, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+# Канал Postgres LISTEN/NOTIFY для событий по заказам
+CHANNEL = "order_events"
+
+
+async def publish(session: AsyncSession, event: dict) -> None:
+    """
+    Публикует событие через pg_notify В ТЕКУЩЕЙ транзакции.
+    Postgres доставит его слушателям только после COMMIT (и не доставит при ROLLBACK),
+    так что событие "заказ создан" никогда не обгонит сам заказ.
+    """
+    payload = json.dumps(event, separators=(",", ":"), default=str)
+    await session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+async def publish_many(session: AsyncSession, events: list[dict]) -> None:
+    """То же для пачки событий — одним запросом (pg_notify по каждому элементу массива)."""
+    if not events:
+        return
+    payloads = [json.dumps(e, separators=(",", ":"), default=str) for e in events]
+    rows = func.unnest(cast(payloads, ARRAY(Text))).table_valued("payload").render_derived()
+    await session.execute(select(func.pg_notify(CHANNEL, rows.c.payload)))
+
+
+class Subscription:
+    """Очередь событий одного клиента (SSE-соединения)."""
+
+    def __init__(self, accept: Callable[[dict], bool]):
+        self.accept = accept
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=100)
+
+    def offer(self, event: dict) -> None:
+        if not self.accept(event):
+            return
+        if self.queue.full():
+            # Медленный клиент: выкидываем самое старое событие, но не блокируем хаб
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    """
+    Один LISTEN-коннект на процесс (asyncpg напрямую, мимо пула SQLAlchemy).
+    Все uvicorn-воркеры получают события друг друга через Postgres.
+    """
+
+    def __init__(self):
+        self._subscriptions: set[Subscription] = set()
+        self._listeners: list[Callable[[dict], None]] = []
+        self._reconnect_listeners: list[Callable[[], object]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, accept: Callable[[dict], bool]) -> Subscription:
+        sub = Subscription(accept)
+        self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscriptions.discard(sub)
+
+    def add_listener(self, listener: Callable[[dict], None], on_reconnect: Callable[[], object] | None = None) -> None:
+        """Внутренние подписчики (например, пулы ленты). on_reconnect — события могли потеряться."""
+        self._listeners.append(listener)
+        if on_reconnect:
+            self._reconnect_listeners.append(on_reconnect)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _dispatch(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"❌ EventHub: ошибка обработчика: {e}")
+        for sub in list(self._subscriptions):
+            sub.offer(event)
+
+    async def _run(self) -> None:
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        first = True
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except Exception as e:
+                print(f"❌ EventHub: нет подключения к Postgres: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: closed.set())
+            try:
+                await conn.add_listener(CHANNEL, self._dispatch)
+                if not first:
+                    # Пока не слушали, события могли пройти мимо
+                    for callback in self._reconnect_listeners:
+                        result = callback()
+                        if asyncio.iscoroutine(result):
+                            await result
+                first = False
+                await closed.wait()
+                print("⚠️ EventHub: соединение закрыто, переподключаемся")
+            except Exception as e:
+                print(f"❌ EventHub: {e}")
+            finally:
+                if not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(1)
+
+
+event_hub = EventHub()
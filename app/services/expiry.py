@@ -0,0 +1,71 @@
+# app/services/expiry.py
+import html
+
+from sqlalchemy import select, tuple_, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+from app.services.order_states import transition, on_transition, searching, searching_since
+from app.services.outbox import enqueue_message, outbox_relay
+from app.services.scheduler import scheduler
+
+
+def stale_orders_query(cutoff) -> Select:
+    """Пачка протухших заказов. Идет по частичному индексу idx_orders_searching_created."""
+    return (
+        select(Order.id, Order.created_at)
+        .where(searching(), Order.created_at < cutoff)
+        .order_by(Order.created_at)
+        .limit(settings.ORDER_EXPIRY_CHUNK_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+
+
+@scheduler.job("expire_orders", interval=settings.ORDER_EXPIRY_INTERVAL_SECONDS)
+async def expire_stale_orders() -> int:
+    """
+    Закрывает заказы, которые висят в поиске дольше ORDER_SEARCH_TTL_HOURS.
+    Пачками по ORDER_EXPIRY_CHUNK_SIZE: каждая пачка — своя короткая транзакция,
+    строки, которые сейчас кто-то меняет (accept/cancel), пропускаем (SKIP LOCKED).
+    """
+    cutoff = searching_since() # now() - ORDER_SEARCH_TTL_HOURS
+    total = 0
+    while True:
+        async with async_session_maker() as session:
+            # Ключ — (id, created_at): по одному id UPDATE искал бы строку во всех партициях
+            stale = stale_orders_query(cutoff)
+            rows = await transition(
+                session,
+                OrderStatus.EXPIRED,
+                tuple_(Order.id, Order.created_at).in_(stale),
+                Order.created_at < cutoff,
+            )
+            await session.commit()
+
+        total += len(rows)
+        if len(rows) < settings.ORDER_EXPIRY_CHUNK_SIZE:
+            break
+
+    if total:
+        print(f"⏰ Закрыто просроченных заказов: {total}")
+        outbox_relay.wake()
+    return total
+
+
+@on_transition(OrderStatus.EXPIRED)
+async def notify_expired(session: AsyncSession, target: OrderStatus, rows) -> None:
+    """Пишем клиентам, что заказ закрылся сам (в outbox, в транзакции перехода)."""
+    result = await session.execute(
+        select(User.id, User.tg_id).where(User.id.in_({row.customer_id for row in rows}))
+    )
+    tg_ids = dict(result.all())
+    for row in rows:
+        text = (
+            f"⏰ <b>Заказ «{html.escape(row.service_type)}» закрыт</b>\n\n"
+            f"За {settings.ORDER_SEARCH_TTL_HOURS:g} ч. мастер так и не был выбран. "
+            f"Создайте заказ заново, если он еще актуален."
+        )
+        enqueue_message(session, tg_ids[row.customer_id], text, parse_mode="HTML")
@@ -0,0 +1,222 @@
+# app/services/feed_engine.py
+import asyncio
+from array import array
+from bisect import bisect_left, insort
+
+from sqlalchemy import select, exists, RowMapping, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.order import Order, OrderResponse
+from app.schemas.order import ORDER_DETAIL_COLUMNS
+from app.services.order_states import searching, searching_since
+
+
+def _contains(sorted_ids: array, order_id: int) -> bool:
+    i = bisect_left(sorted_ids, order_id)
+    return i < len(sorted_ids) and sorted_ids[i] == order_id
+
+
+# Запросы — функциями: их же EXPLAIN'ит scripts/check_plans.py
+def pool_query() -> Select:
+    """Все заказы в поиске (только id и service_type) — для пулов."""
+    return (
+        select(Order.id, Order.service_type)
+        .where(searching(), Order.created_at >= searching_since())
+        .order_by(Order.id)
+    )
+
+
+def seen_query(worker_id: int) -> Select:
+    """Свайпы мастера. Нужны только открытые заказы — так массив остается маленьким."""
+    return (
+        select(OrderResponse.order_id)
+        .join(Order, (Order.id == OrderResponse.order_id) & (Order.created_at == OrderResponse.order_created_at))
+        .where(
+            OrderResponse.worker_id == worker_id,
+            Order.created_at >= searching_since(),
+            searching()
+        )
+        .order_by(OrderResponse.order_id)
+    )
+
+
+def page_query(ids: list[int], worker_id: int) -> Select:
+    """
+    Гидрация: только эта страница, по id. Первичный ключ — (id, created_at),
+    поэтому без границы по created_at Postgres искал бы id в каждой партиции.
+    Статус и свайп перепроверяем — пул мог отстать от других процессов.
+    """
+    return select(*ORDER_DETAIL_COLUMNS).where(
+        Order.id.in_(ids),
+        Order.created_at >= searching_since(),
+        searching(),
+        ~exists().where(
+            OrderResponse.order_id == Order.id,
+            OrderResponse.order_created_at == Order.created_at,
+            OrderResponse.worker_id == worker_id
+        )
+    )
+
+
+class FeedEngine:
+    """
+    Кандидаты для ленты мастера в памяти процесса.
+
+    Для каждого service_type держим отсортированный массив id открытых заказов
+    (SEARCHING). Для мастера — отсортированный массив id заказов, которые он уже
+    видел (только среди открытых). Страница ленты считается в памяти, а в Postgres
+    идем только за самими заказами этой страницы (по первичному ключу).
+
+    Пулы обновляются на create/cancel/accept/complete и периодически
+    пересобираются из БД (изменения из других процессов). При гидрации статус и
+    свайпы перепроверяются в SQL, так что устаревший пул не покажет лишнего.
+    """
+
+    def __init__(self):
+        self._pools: dict[str, array] = {}
+        self._service_of: dict[int, str] = {}
+        # worker_id -> array('q') отсортированных id уже виденных открытых заказов
+        self._seen = TTLCache(max_size=settings.FEED_SEEN_CACHE_SIZE, ttl=settings.FEED_SEEN_CACHE_TTL)
+        # Изменения, пришедшие во время пересборки пулов (применим их поверх)
+        self._journal: list[tuple[str, int, str | None]] | None = None
+        self._task: asyncio.Task | None = None
+        self.ready = False
+
+    # --- ЖИЗНЕННЫЙ ЦИКЛ ---
+    async def start(self) -> None:
+        # Пересборку запускаем до первой загрузки: если старт оборвут по таймауту,
+        # пулы догрузятся на следующей пересборке
+        self._task = asyncio.create_task(self._resync_loop())
+        try:
+            await self.reload()
+        except Exception as e:
+            # Без пулов лента просто работает через SQL
+            print(f"❌ FeedEngine: не удалось загрузить пулы: {e}")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _resync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.FEED_POOL_RESYNC_SECONDS)
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"❌ FeedEngine: ошибка пересборки пулов: {e}")
+
+    async def reload(self) -> None:
+        """Пересобирает пулы из БД (SEARCHING-заказы, только id и service_type)."""
+        self._journal = []
+        try:
+            async with async_session_maker() as session:
+                result = await session.execute(pool_query())
+                rows = result.all()
+        except BaseException:
+            self._journal = None
+            raise
+
+        pools: dict[str, array] = {}
+        service_of: dict[int, str] = {}
+        for order_id, service_type in rows:
+            pools.setdefault(service_type, array("q")).append(order_id)
+            service_of[order_id] = service_type
+
+        journal, self._journal = self._journal, None
+        self._pools, self._service_of = pools, service_of
+        for op, order_id, service_type in journal:
+            if op == "add":
+                self.add_order(order_id, service_type)
+            else:
+                self.remove_order(order_id)
+
+        self.ready = True
+
+    # --- ИНКРЕМЕНТАЛЬНЫЕ ОБНОВЛЕНИЯ (вызываем после коммита) ---
+    def add_order(self, order_id: int, service_type: str) -> None:
+        if self._journal is not None:
+            self._journal.append(("add", order_id, service_type))
+        if order_id in self._service_of:
+            return
+        insort(self._pools.setdefault(service_type, array("q")), order_id)
+        self._service_of[order_id] = service_type
+
+    def remove_order(self, order_id: int) -> None:
+        if self._journal is not None:
+            self._journal.append(("remove", order_id, None))
+        service_type = self._service_of.pop(order_id, None)
+        if service_type is None:
+            return
+        pool = self._pools[service_type]
+        i = bisect_left(pool, order_id)
+        if i < len(pool) and pool[i] == order_id:
+            del pool[i]
+
+    def mark_seen(self, worker_id: int, order_ids) -> None:
+        seen = self._seen.get(worker_id)
+        if seen is None:
+            return # Загрузится из БД при следующем запросе
+        for order_id in order_ids:
+            if order_id in self._service_of and not _contains(seen, order_id):
+                insort(seen, order_id)
+
+    def on_event(self, event: dict) -> None:
+        """События из EventHub (в т.ч. от других процессов)."""
+        if event.get("type") == "order_created":
+            self.add_order(event["order_id"], event["service_type"])
+        elif event.get("type") == "order_removed":
+            self.remove_order(event["order_id"])
+
+    # --- ЛЕНТА ---
+    async def _get_seen(self, session: AsyncSession, worker_id: int) -> array:
+        seen = self._seen.get(worker_id)
+        if seen is None:
+            result = await session.execute(seen_query(worker_id))
+            seen = array("q", result.scalars().all())
+            self._seen.set(worker_id, seen)
+        return seen
+
+    async def page(
+        self,
+        session: AsyncSession,
+        worker_id: int,
+        service_type: str | None,
+        before_id: int | None,
+        limit: int,
+    ) -> tuple[list[RowMapping], int | None]:
+        """
+        Страница ленты (новые сверху, id < before_id).
+        Возвращает (строки под OrderReadDetail, before_id для следующей страницы или None).
+        """
+        pool = self._pools.get(service_type)
+        if not pool:
+            return [], None
+
+        seen = await self._get_seen(session, worker_id)
+
+        # Идем по пулу от большего id к меньшему и пропускаем виденные
+        i = bisect_left(pool, before_id) if before_id is not None else len(pool)
+        ids: list[int] = []
+        while i > 0 and len(ids) <= limit:
+            i -= 1
+            if not _contains(seen, pool[i]):
+                ids.append(pool[i])
+
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        if not ids:
+            return [], None
+        # Курсор — по последнему кандидату, даже если он отсеется при гидрации
+        next_before = ids[-1] if has_more else None
+
+        result = await session.execute(page_query(ids, worker_id))
+        by_id = {row["id"]: row for row in result.mappings()}
+        orders = [by_id[order_id] for order_id in ids if order_id in by_id]
+        return orders, next_before
+
+
+feed_engine = FeedEngine()
@@ -0,0 +1,146 @@
+# app/services/images.py
+"""
+Превью и WebP-варианты фото заказов.
+
+После загрузки (finalize / /api/upload) оригинал скачивается из бакета, Pillow
+в отдельном процессе поворачивает его по EXIF, выкидывает метаданные (GPS
+и т.п.) и ужимает в WebP. Варианты кладутся рядом с оригиналом:
+
+    <uuid>.jpg -> <uuid>_thumb.webp (PHOTO_THUMB_SIZE), <uuid>_md.webp (PHOTO_MEDIUM_SIZE)
+
+Сам оригинал не трогаем. Если процесс упал до обработки — фото доделает
+задача планировщика process_photos.
+"""
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, func
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.storage import get_object_bytes, put_object_bytes, variant_name
+from app.models.photo import Photo
+from app.services.scheduler import scheduler
+
+# Вариант -> размер стороны квадрата, в который вписываем картинку
+VARIANTS = {
+    "thumb": settings.PHOTO_THUMB_SIZE,
+    "md": settings.PHOTO_MEDIUM_SIZE,
+}
+
+
+def render_variants(data: bytes, sizes: dict[str, int], quality: int) -> dict[str, bytes]:
+    """
+    Выполняется в дочернем процессе (ProcessPoolExecutor), поэтому — обычная
+    функция верхнего уровня без доступа к БД/сети. Возвращает вариант -> WebP.
+    """
+    from PIL import Image, ImageOps # Pillow нужен только в процессах обработки
+
+    with Image.open(io.BytesIO(data)) as original:
+        # Телефон пишет "поверни на 90°" в EXIF — применяем и дальше EXIF не тащим
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    result = {}
+    for variant, size in sizes.items():
+        copy = image.copy()
+        copy.thumbnail((size, size), Image.Resampling.LANCZOS) # Только уменьшает
+        out = io.BytesIO()
+        copy.save(out, "WEBP", quality=quality, method=4) # Без exif= — метаданные не пишутся
+        result[variant] = out.getvalue()
+    return result
+
+
+class PhotoProcessor:
+    """
+    Обработка фото в пуле процессов (Pillow держит CPU и GIL — в event loop
+    или потоках это тормозило бы остальные запросы). Одновременно в работе
+    не больше PHOTO_PROCESS_WORKERS * 2 фото, чтобы не держать в памяти очередь оригиналов.
+    """
+
+    def __init__(self):
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(settings.PHOTO_PROCESS_WORKERS * 2)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        # Не fork: к старту в процессе уже крутятся потоки (пулы minio, asyncpg) и event loop,
+        # форк копирует их блокировки. forkserver форкает чистый сервер без этого состояния
+        self._pool = ProcessPoolExecutor(
+            max_workers=settings.PHOTO_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, filename: str) -> None:
+        """Обработать в фоне, ответ клиенту не ждет."""
+        task = asyncio.create_task(self.process(filename))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def process(self, filename: str) -> bool:
+        if self._pool is None:
+            return False # Не запущен (например, скрипт) — доделает process_photos
+        async with self._slots:
+            try:
+                data = await get_object_bytes(filename)
+                loop = asyncio.get_running_loop()
+                try:
+                    variants = await loop.run_in_executor(
+                        self._pool, render_variants, data, VARIANTS, settings.PHOTO_WEBP_QUALITY
+                    )
+                except Exception as e:
+                    # Битый / не картинка — больше не пробуем, остаемся на оригинале
+                    print(f"⚠️ Фото {filename} не обработано: {e}")
+                    values = {"process_error": str(e)[:500]}
+                else:
+                    for variant, webp in variants.items():
+                        await put_object_bytes(variant_name(filename, variant), webp, "image/webp")
+                    values = {"processed_at": datetime.now(), "process_error": None}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Хранилище недоступно — повторит задача process_photos
+                print(f"❌ Фото {filename}: ошибка хранилища: {e}")
+                return False
+
+        # Строки может не быть (загрузка через /api/upload) — тогда просто ничего не обновится
+        async with async_session_maker() as session:
+            await session.execute(update(Photo).where(Photo.object_name == filename).values(**values))
+            await session.commit()
+        return "processed_at" in values
+
+
+photo_processor = PhotoProcessor()
+
+
+@scheduler.job("process_photos", interval=settings.PHOTO_SWEEP_INTERVAL_SECONDS)
+async def process_pending_photos() -> None:
+    """Фото, которые не обработались сразу (процесс перезапускали и т.п.)."""
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(Photo.object_name)
+            .where(
+                Photo.processed_at.is_(None),
+                Photo.process_error.is_(None),
+                Photo.created_at < func.now() - timedelta(minutes=1), # Свежие еще в работе
+            )
+            .order_by(Photo.created_at)
+            .limit(100)
+        )
+        pending = result.scalars().all()
+
+    done = 0
+    for filename in pending:
+        done += await photo_processor.process(filename)
+    if done:
+        print(f"🖼 Доделаны превью: {done} фото")
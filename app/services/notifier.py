@@ -0,0 +1,220 @@
+# app/services/notifier.py
+import asyncio
+import html
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import WebAppInfo
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy import select, or_, func, Select
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.loader import get_bot
+from app.models.user import User, WorkerProfile
+
+
+class TokenBucket:
+    """Классический token bucket: rate токенов в секунду, не больше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # Лок — чтобы ждущие получали токены по очереди, а не толпой
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Telegram сказал "подожди" — уводим ведро в минус на это время."""
+        self._refill()
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class BotDispatcher:
+    """
+    Фоновая отправка сообщений бота с учетом лимитов Telegram:
+    ~30 сообщений/с на бота и ~1 сообщение/с в один чат.
+
+    HTTP-хендлеры только кладут сообщения в очередь (send()) и сразу отвечают.
+    Несколько отправщиков разбирают очередь, перед отправкой берут токен из
+    общего ведра и из ведра чата. На TelegramRetryAfter ставим на паузу ведро
+    (общее — если лимит общий) и возвращаем сообщение в очередь.
+    """
+
+    def __init__(self, bot: Bot | None = None):
+        self.bot = bot
+        self._queue: asyncio.Queue[tuple[int, str, dict, int]] = asyncio.Queue(maxsize=settings.NOTIFY_QUEUE_SIZE)
+        self._global = TokenBucket(settings.NOTIFY_GLOBAL_RATE, settings.NOTIFY_GLOBAL_RATE)
+        self._chats = TTLCache(max_size=10_000, ttl=60)
+        self._workers: list[asyncio.Task] = []
+        # Фоновые рассылки (fan-out), чтобы их не собрал GC
+        self._jobs: set[asyncio.Task] = set()
+
+    # --- ЖИЗНЕННЫЙ ЦИКЛ ---
+    async def start(self) -> None:
+        if self.bot is None:
+            self.bot = get_bot()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.NOTIFY_CONCURRENCY)
+        ]
+
+    async def stop(self) -> None:
+        for task in [*self._workers, *self._jobs]:
+            task.cancel()
+        self._workers = []
+        if not self._queue.empty():
+            print(f"⚠️ BotDispatcher: не отправлено {self._queue.qsize()} сообщений")
+
+    # --- ПОСТАНОВКА В ОЧЕРЕДЬ ---
+    def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """Не ждет отправки. False — очередь переполнена, сообщение выброшено."""
+        try:
+            self._queue.put_nowait((chat_id, text, kwargs, 0))
+            return True
+        except asyncio.QueueFull:
+            print(f"❌ BotDispatcher: очередь переполнена, сообщение в {chat_id} выброшено")
+            return False
+
+    async def enqueue(self, chat_id: int, text: str, **kwargs) -> None:
+        """Для фоновых рассылок: ждет места в очереди вместо того, чтобы выбрасывать."""
+        await self._queue.put((chat_id, text, kwargs, 0))
+
+    def spawn(self, coro) -> None:
+        """Запускает рассылку в фоне (после коммита, не задерживая ответ)."""
+        task = asyncio.create_task(coro)
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    # --- ОТПРАВКА ---
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(settings.NOTIFY_PER_CHAT_RATE, 1)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, text, kwargs, attempt = await self._queue.get()
+            try:
+                await self._deliver(chat_id, text, kwargs, attempt)
+            except Exception as e:
+                print(f"❌ BotDispatcher: ошибка отправки в {chat_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def send_now(self, chat_id: int, text: str, **kwargs) -> None:
+        """
+        Отправляет сразу, но в рамках лимитов. Ошибки Telegram пробрасывает
+        (на RetryAfter заодно притормаживает ведра) — повтор решает вызывающий.
+        """
+        chat_bucket = self._chat_bucket(chat_id)
+        await chat_bucket.acquire()
+        await self._global.acquire()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except TelegramRetryAfter as e:
+            print(f"⚠️ BotDispatcher: flood control, ждем {e.retry_after} с")
+            # Не знаем, какой лимит сработал — притормаживаем и чат, и всю отправку
+            chat_bucket.pause(e.retry_after)
+            self._global.pause(e.retry_after)
+            raise
+
+    async def _deliver(self, chat_id: int, text: str, kwargs: dict, attempt: int) -> None:
+        try:
+            await self.send_now(chat_id, text, **kwargs)
+        except TelegramRetryAfter:
+            if attempt >= settings.NOTIFY_MAX_RETRIES:
+                print(f"❌ BotDispatcher: сдались после {attempt} повторов ({chat_id})")
+                return
+            try:
+                self._queue.put_nowait((chat_id, text, kwargs, attempt + 1))
+            except asyncio.QueueFull:
+                print(f"❌ BotDispatcher: очередь переполнена, повтор в {chat_id} выброшен")
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Юзер заблокировал бота / чата нет — повторять бессмысленно
+            print(f"⚠️ BotDispatcher: чат {chat_id} недоступен: {e}")
+
+
+def workers_to_notify_query(service_type: str, customer_id: int, lat: float, lon: float, after_id: int) -> Select:
+    """Пачка мастеров для рассылки (id > after_id). Его же EXPLAIN'ит scripts/check_plans.py."""
+    order_geog = func.geography(func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326))
+    return (
+        select(User.id, User.tg_id)
+        .outerjoin(WorkerProfile, WorkerProfile.user_id == User.id)
+        .where(
+            User.role == "worker",
+            User.service_type == service_type,
+            User.id != customer_id,
+            User.id > after_id,
+            or_(
+                WorkerProfile.home_location.is_(None),
+                func.ST_DWithin(func.geography(WorkerProfile.home_location), order_geog, settings.NOTIFY_RADIUS_KM * 1000),
+            ),
+        )
+        .order_by(User.id)
+        .limit(settings.NOTIFY_BATCH_SIZE)
+    )
+
+
+async def notify_new_order(
+    dispatcher: BotDispatcher,
+    order_id: int,
+    customer_id: int,
+    service_type: str,
+    price: int | None,
+    address: str | None,
+    lat: float,
+    lon: float,
+) -> None:
+    """
+    Рассылает новый заказ подходящим мастерам: та же профессия и "домашняя"
+    точка в радиусе (мастера без точки получают все заказы своей профессии).
+    Мастеров берем пачками по id, чтобы не тянуть всех в память разом.
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="🚀 Открыть ленту", web_app=WebAppInfo(url=f"{settings.BASE_URL}/webapp/worker/feed"))
+    markup = builder.as_markup()
+    text = (
+        f"🆕 <b>Новый заказ: {html.escape(service_type)}</b>\n\n"
+        f"Цена: {price or '—'} ₽\n"
+        f"Адрес: {html.escape(address or '—')}" # Адрес пишет клиент — экранируем
+    )
+
+    last_id = 0
+    sent = 0
+    while True:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                workers_to_notify_query(service_type, customer_id, lat, lon, after_id=last_id)
+            )
+            rows = result.all()
+        if not rows:
+            break
+
+        for _, tg_id in rows:
+            # Если очередь забита — ждем отправщиков (HTTP-запрос от этого не зависит)
+            await dispatcher.enqueue(tg_id, text, parse_mode="HTML", reply_markup=markup)
+        sent += len(rows)
+        last_id = rows[-1][0]
+
+    print(f"📣 Заказ #{order_id}: в очереди уведомлений {sent} мастеров")
+
+
+bot_dispatcher = BotDispatcher()
@@ -0,0 +1,103 @@
+# app/services/order_states.py
+from datetime import timedelta
+from typing import Awaitable, Callable, Sequence
+
+from sqlalchemy import update, func, literal, Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.order import Order, OrderStatus
+from app.services.event_hub import publish_many
+
+
+# Разрешенные переходы: из какого статуса в какие
+TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    OrderStatus.SEARCHING: {OrderStatus.IN_PROGRESS, OrderStatus.CANCELED, OrderStatus.EXPIRED},
+    OrderStatus.IN_PROGRESS: {OrderStatus.COMPLETED},
+}
+
+
+def sources_for(target: OrderStatus) -> list[OrderStatus]:
+    """Из каких статусов можно попасть в target."""
+    return [source for source, targets in TRANSITIONS.items() if target in targets]
+
+
+def searching():
+    """
+    status = 'SEARCHING' литералом в SQL, а не параметром ($1).
+    asyncpg работает через prepared statements, и в "общем" (generic) плане
+    с параметром Postgres не может доказать условие частичного индекса
+    WHERE status = 'SEARCHING' — и не использует его.
+    """
+    return Order.status == literal(OrderStatus.SEARCHING, Order.status.type, literal_execute=True)
+
+
+def searching_since():
+    """
+    Нижняя граница created_at для заказов в поиске: старше ORDER_SEARCH_TTL_HOURS
+    они протухают (app/services/expiry.py). Условие в запросах ленты еще и дает
+    Postgres отсечь старые партиции orders.
+    """
+    return func.now() - timedelta(hours=settings.ORDER_SEARCH_TTL_HOURS)
+
+
+def can_transition(source: OrderStatus, target: OrderStatus) -> bool:
+    return target in TRANSITIONS.get(source, ())
+
+
+# Обработчики переходов: вызываются ВНУТРИ транзакции перехода,
+# так что их записи (outbox, события) коммитятся вместе с ним
+TransitionHook = Callable[[AsyncSession, OrderStatus, list[Row]], Awaitable[None]]
+_hooks: dict[OrderStatus, list[TransitionHook]] = {}
+
+
+def on_transition(*targets: OrderStatus):
+    """Декоратор: подписать async-функцию (session, target, rows) на переходы в targets."""
+    def decorator(hook: TransitionHook) -> TransitionHook:
+        for target in targets:
+            _hooks.setdefault(target, []).append(hook)
+        return hook
+    return decorator
+
+
+async def transition(
+    session: AsyncSession,
+    target: OrderStatus,
+    *conditions,
+    values: dict | None = None,
+    returning: Sequence = (),
+) -> list[Row]:
+    """
+    Переводит в target ВСЕ заказы, подходящие под conditions, одним UPDATE.
+
+    Статус-источник проверяется в самом UPDATE (WHERE status IN (...)), поэтому
+    параллельные переходы одного заказа не "выигрывают" оба: второй просто
+    не найдет строку. Условия могут ссылаться на другие таблицы — они уйдут
+    в UPDATE ... FROM. Возвращает строки (id, customer_id, service_type, *returning)
+    только тех заказов, что реально перешли. Коммит — на вызывающем.
+    """
+    sources = sources_for(target)
+    if not sources:
+        raise ValueError(f"В статус {target} перейти нельзя")
+
+    result = await session.execute(
+        update(Order)
+        .where(Order.status.in_(sources), *conditions)
+        .values(status=target, version=Order.version + 1, **(values or {}))
+        .returning(Order.id, Order.customer_id, Order.service_type, *returning)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    if not rows:
+        return rows
+
+    if OrderStatus.SEARCHING in sources:
+        # Заказы ушли из поиска — пулы ленты и SSE-клиенты узнают после коммита
+        await publish_many(session, [
+            {"type": "order_removed", "order_id": row.id, "service_type": row.service_type}
+            for row in rows
+        ])
+
+    for hook in _hooks.get(target, ()):
+        await hook(session, target, rows)
+    return rows
@@ -0,0 +1,166 @@
+# app/services/outbox.py
+import asyncio
+from datetime import timedelta
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select, update, func, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.outbox import OutboxMessage
+from app.services.notifier import BotDispatcher, bot_dispatcher
+
+
+def enqueue_message(
+    session: AsyncSession,
+    chat_id: int,
+    text: str,
+    parse_mode: str | None = None,
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> None:
+    """
+    Кладет сообщение бота в outbox В ТЕКУЩЕЙ транзакции.
+    Уйдет только если транзакция закоммитится; коммит — на вызывающем.
+    """
+    session.add(OutboxMessage(
+        chat_id=chat_id,
+        text=text,
+        parse_mode=parse_mode,
+        reply_markup=reply_markup.model_dump(exclude_none=True) if reply_markup else None,
+    ))
+
+
+def claim_query() -> Select:
+    """Готовые к отправке сообщения (их же EXPLAIN'ит scripts/check_plans.py)."""
+    return (
+        select(OutboxMessage.id)
+        .where(
+            OutboxMessage.sent_at.is_(None),
+            OutboxMessage.failed_at.is_(None),
+            OutboxMessage.available_at <= func.now(),
+        )
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(settings.OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+
+
+class OutboxRelay:
+    """
+    Фоновая отправка сообщений из outbox_messages.
+
+    Пачку строк забираем через FOR UPDATE SKIP LOCKED и сразу сдвигаем им
+    available_at на время "аренды" — так несколько процессов делят работу и
+    не шлют одно и то же. Отправляем уже без блокировок (через BotDispatcher
+    с лимитами Telegram), потом отмечаем sent_at или откладываем повтор.
+    Процесс упал посреди отправки — аренда истечет, строку заберет другой
+    (доставка "хотя бы один раз").
+    """
+
+    def __init__(self, dispatcher: BotDispatcher):
+        self.dispatcher = dispatcher
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def wake(self) -> None:
+        """Хендлер что-то закоммитил — не ждем следующего опроса."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                print(f"❌ Outbox: ошибка: {e}")
+                claimed = 0
+
+            if claimed < settings.OUTBOX_BATCH_SIZE:
+                # Очередь разобрана — спим до опроса или до wake()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Забирает и отправляет одну пачку. Возвращает размер пачки."""
+        batch = await self._claim()
+        if not batch:
+            return 0
+
+        results = await asyncio.gather(*(self._send(row) for row in batch))
+
+        sent = [row.id for row, (ok, _, _) in zip(batch, results) if ok]
+        async with async_session_maker() as session:
+            if sent:
+                await session.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_(sent))
+                    .values(sent_at=func.now(), last_error=None)
+                )
+            for row, (ok, delay, error) in zip(batch, results):
+                if ok:
+                    continue
+                if delay is None or row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    print(f"❌ Outbox: сообщение #{row.id} не доставлено: {error}")
+                    values = {"failed_at": func.now(), "last_error": error}
+                else:
+                    values = {"available_at": func.now() + timedelta(seconds=delay), "last_error": error}
+                await session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id == row.id).values(**values)
+                )
+            await session.commit()
+        return len(batch)
+
+    async def _claim(self) -> list:
+        async with async_session_maker() as session:
+            ids = claim_query()
+            result = await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(ids))
+                .values(
+                    available_at=func.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+                    attempts=OutboxMessage.attempts + 1,
+                )
+                .returning(
+                    OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text,
+                    OutboxMessage.parse_mode, OutboxMessage.reply_markup, OutboxMessage.attempts,
+                )
+            )
+            rows = result.all()
+            await session.commit()
+        return rows
+
+    async def _send(self, row) -> tuple[bool, float | None, str | None]:
+        """(отправлено, через сколько секунд повторить или None — не повторять, ошибка)."""
+        kwargs = {}
+        if row.parse_mode:
+            kwargs["parse_mode"] = row.parse_mode
+        if row.reply_markup:
+            kwargs["reply_markup"] = InlineKeyboardMarkup.model_validate(row.reply_markup)
+
+        try:
+            await self.dispatcher.send_now(row.chat_id, row.text, **kwargs)
+            return True, None, None
+        except TelegramRetryAfter as e:
+            return False, e.retry_after, str(e)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Бот заблокирован / чата нет — повтор не поможет
+            return False, None, str(e)
+        except Exception as e:
+            # Сеть, 5xx и т.п. — экспоненциальная пауза: 2, 4, 8 ... секунд
+            delay = min(2 ** row.attempts, settings.OUTBOX_MAX_BACKOFF_SECONDS)
+            return False, delay, str(e)
+
+
+outbox_relay = OutboxRelay(bot_dispatcher)
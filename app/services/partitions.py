@@ -0,0 +1,229 @@
+# app/services/partitions.py
+"""
+Помесячные партиции orders и order_responses.
+
+orders партиционирована по created_at, order_responses — по order_created_at
+(дата создания ЗАКАЗА, а не отклика). Границы у обеих таблиц одинаковые, так
+что отклики лежат в той же "месячной" партиции, что и их заказ, и старый месяц
+можно отцепить целиком: сначала отклики, потом заказы (на заказы ссылается FK).
+
+Страховка — DEFAULT-партиции orders_default / order_responses_default: если
+месяцы вперед вдруг не созданы, INSERT не падает, строки ложатся туда, а
+ensure_partitions при создании месяца переносит их в настоящую партицию.
+
+Запуск вручную:
+    python -m app.services.partitions ensure            # партиции на N месяцев вперед
+    python -m app.services.partitions archive --keep 12 # старые месяцы -> схема archive
+"""
+import argparse
+import asyncio
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.scheduler import scheduler
+
+# Таблица -> колонка, по которой режем. Порядок важен: сначала родитель (orders)
+PARTITIONED_TABLES = {
+    "orders": "created_at",
+    "order_responses": "order_created_at",
+}
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_SUFFIX = "_default"
+# Составной FK order_responses(order_id, order_created_at) -> orders(id, created_at)
+ORDER_FK_NAME = "fk_order_responses_order"
+# DETACH держит ACCESS EXCLUSIVE на родителя: не дождались блокировки — месяц упадет, повторим позже
+DETACH_LOCK_TIMEOUT = "5s"
+
+_PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}{DEFAULT_SUFFIX}"
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    """DDL месячной партиции [month, month + 1)."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} "
+        f"PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> dict[date, str]:
+    """Месяц -> имя партиции (только наши помесячные, по имени table_pYYYYMM)."""
+    result = await conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table
+    """), {"table": table})
+
+    partitions = {}
+    for (name,) in result.all():
+        match = _PARTITION_RE.match(name)
+        if match and match["table"] == table:
+            partitions[date(int(match["year"]), int(match["month"]), 1)] = name
+    return partitions
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int | None = None) -> list[str]:
+    """Создает партиции с текущего месяца на months_ahead вперед. Возвращает созданные."""
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+
+    created = []
+    current = month_start(date.today())
+    existing = {table: await list_partitions(conn, table) for table in PARTITIONED_TABLES}
+    for i in range(months_ahead + 1):
+        month = add_months(current, i)
+        missing = [table for table in PARTITIONED_TABLES if month not in existing[table]]
+        if not missing:
+            continue
+        if await _default_has_rows(conn, month):
+            await _split_default(conn, month, missing)
+        else:
+            for table in missing:
+                await conn.execute(text(create_partition_sql(table, month)))
+        created.extend(partition_name(table, month) for table in missing)
+    return created
+
+
+def _month_range(column: str, month: date) -> str:
+    return f"{column} >= '{month:%Y-%m-%d}' AND {column} < '{add_months(month, 1):%Y-%m-%d}'"
+
+
+async def _default_has_rows(conn: AsyncConnection, month: date) -> bool:
+    result = await conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {default_partition_name('orders')} "
+        f"WHERE {_month_range('created_at', month)})"
+    ))
+    return bool(result.scalar())
+
+
+async def _split_default(conn: AsyncConnection, month: date, tables: list[str]) -> None:
+    """
+    В DEFAULT уже есть строки этого месяца (партицию вовремя не создали) —
+    CREATE ... PARTITION OF упадет. Переносим их в отдельную таблицу и цепляем
+    ее как партицию. Сначала отклики: пока они в order_responses, FK не даст
+    удалить их заказы. Выполнять в одной транзакции.
+    """
+    print(f"⚠️ Партиции: в DEFAULT есть строки за {month:%Y-%m}, переносим")
+    for table in reversed(PARTITIONED_TABLES):
+        if table not in tables:
+            continue
+        name = partition_name(table, month)
+        column = PARTITIONED_TABLES[table]
+        await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        await conn.execute(text(
+            f"WITH moved AS (DELETE FROM {default_partition_name(table)} "
+            f"WHERE {_month_range(column, month)} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ))
+    for table in PARTITIONED_TABLES:
+        if table in tables:
+            await conn.execute(text(
+                f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+
+
+async def archive_partitions(conn: AsyncConnection, keep_months: int) -> list[str]:
+    """
+    Отцепляет месяцы старше keep_months и переносит их в схему archive
+    (данные остаются в БД, но горячие запросы их больше не видят).
+    Месяц пропускаем, если в нем есть незакрытые заказы.
+
+    DETACH ... CONCURRENTLY нельзя при DEFAULT-партиции, поэтому обычный DETACH:
+    он берет ACCESS EXCLUSIVE на родителя, так что каждая партиция отцепляется
+    своей короткой транзакцией с lock_timeout (не ждем долгие запросы, заняв очередь).
+    """
+    cutoff = add_months(month_start(date.today()), -keep_months)
+    await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+    orders = await list_partitions(conn, "orders")
+    responses = await list_partitions(conn, "order_responses")
+    await conn.commit()
+
+    archived = []
+    for month in sorted(m for m in orders if m < cutoff):
+        open_orders = await conn.execute(text(
+            f"SELECT count(*) FROM {orders[month]} "
+            f"WHERE status IN ('SEARCHING', 'IN_PROGRESS')"
+        ))
+        count = open_orders.scalar()
+        await conn.commit()
+        if count:
+            print(f"⚠️ Партиции: {orders[month]} — {count} незакрытых заказов, пропускаем")
+            continue
+
+        # Сначала отклики: они ссылаются на заказы по FK
+        for table, name in (("order_responses", responses.get(month)), ("orders", orders[month])):
+            if name is None:
+                continue
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if table == "order_responses":
+                # Отцепленная таблица сохраняет копию FK на orders — иначе заказы не отцепить
+                await conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {ORDER_FK_NAME}"))
+            await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            await conn.commit()
+            archived.append(name)
+    return archived
+
+
+@scheduler.job("ensure_partitions", interval=settings.PARTITION_CHECK_INTERVAL_SECONDS)
+async def ensure_partitions_job() -> None:
+    """
+    Раз в сутки докидываем партиции вперед (отцепление старых — только вручную).
+    Плюс один раз при старте процесса (lifespan): таймер планировщика начинается
+    заново при каждом рестарте, и при частых деплоях сутки могут так и не пройти.
+    """
+    async with engine.begin() as conn:
+        created = await ensure_partitions(conn)
+    if created:
+        print(f"🗂 Созданы партиции: {', '.join(created)}")
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Обслуживание партиций orders / order_responses")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ensure = sub.add_parser("ensure", help="создать партиции на будущее")
+    ensure.add_argument("--months", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    archive = sub.add_parser("archive", help="отцепить старые месяцы в схему archive")
+    archive.add_argument("--keep", type=int, default=settings.PARTITION_KEEP_MONTHS)
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        # В транзакции: перенос строк из DEFAULT должен пройти целиком
+        async with engine.begin() as conn:
+            names = await ensure_partitions(conn, args.months)
+    else:
+        async with engine.connect() as conn:
+            names = await archive_partitions(conn, args.keep)
+    await engine.dispose()
+
+    print(f"✅ Готово: {', '.join(names) if names else 'изменений нет'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,200 @@
+# app/services/photo_gc.py
+"""
+Сборка мусора в бакете фото.
+
+Мусор — загрузки, которые так и не попали в заказ (закрыли форму, упал
+create_order), недокачанные tmp/ объекты (/api/upload и presigned PUT без
+finalize) и превью к ним.
+Объекты моложе PHOTO_GC_GRACE_HOURS не трогаем: фото могли только что
+загрузить под заказ, который еще не создан. То же для фото, которые за это
+время отдали клиенту как "уже есть" (photos.last_used_at): байты старые,
+но заказ с ними только создается.
+
+Память не зависит от размера бакета: листинг MinIO и список используемых
+фото из БД оба идут отсортированными потоками, и мы сливаем их как при
+merge join — в памяти одна страница листинга, одна пачка имен из БД и одна
+пачка на удаление.
+
+Запуск вручную:
+    python -m app.services.photo_gc --dry-run           # только посчитать
+    python -m app.services.photo_gc --grace-hours 72
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from minio.datatypes import Object
+from sqlalchemy import text, select, delete, exists, func
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.storage import TMP_PREFIX, iter_objects, remove_objects
+from app.models.photo import Photo, OrderPhoto
+from app.services.partitions import ARCHIVE_SCHEMA
+from app.services.photos import PHOTO_NAME_RE
+from app.services.scheduler import scheduler
+
+
+@dataclass
+class GcStats:
+    scanned: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    removed: int = 0
+
+
+def _order_photo_names(table: str) -> str:
+    return f"""
+        SELECT e.name FROM {table} o
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE WHEN json_typeof(o.photos) = 'array' THEN o.photos ELSE '[]'::json END
+        ) AS e(name)"""
+
+
+async def referenced_stems() -> AsyncIterator[str]:
+    """
+    Имена используемых фото без расширения (sha256 / uuid), по возрастанию.
+    Используемые — со ссылкой в order_photos, плюс всё из orders.photos (старые
+    uuid-загрузки строк в photos не имеют), включая отцепленные в archive месяцы.
+    COLLATE "C" — тот же побайтовый порядок, что у листинга S3.
+
+    Читаем пачками по PHOTO_GC_REFS_CHUNK (keyset: stem > последний), каждая —
+    своим коротким запросом. Открытый курсор на весь обход бакета держал бы
+    транзакцию часами: VACUUM не чистит orders, а соединение занято.
+    """
+    async with engine.connect() as conn:
+        archived = await conn.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = :schema AND tablename ~ '^orders_p[0-9]{6}$'"
+        ), {"schema": ARCHIVE_SCHEMA})
+        tables = ["orders"] + [f"{ARCHIVE_SCHEMA}.{name}" for (name,) in archived.all()]
+
+    sources = [
+        "SELECT p.object_name AS name FROM photos p "
+        "WHERE EXISTS (SELECT 1 FROM order_photos op WHERE op.photo_id = p.id)"
+    ] + [_order_photo_names(table) for table in tables]
+    query = text(
+        f"SELECT DISTINCT stem FROM ("
+        f"SELECT split_part(name, '.', 1) COLLATE \"C\" AS stem FROM ({' UNION ALL '.join(sources)}) refs"
+        f") stems WHERE stem > :last ORDER BY stem LIMIT :limit"
+    )
+
+    last = ""
+    while True:
+        async with engine.connect() as conn:
+            result = await conn.execute(query, {"last": last, "limit": settings.PHOTO_GC_REFS_CHUNK})
+            stems = result.scalars().all()
+        for stem in stems:
+            yield stem
+        if len(stems) < settings.PHOTO_GC_REFS_CHUNK:
+            return
+        last = stems[-1]
+
+
+async def _remove_orphans(orphans: list[Object], grace_hours: float, stats: GcStats, dry_run: bool) -> None:
+    stats.orphans += len(orphans)
+    stats.orphan_bytes += sum(obj.size or 0 for obj in orphans)
+    if dry_run:
+        return
+
+    # Оригиналы (не tmp/ и не превью): у них может быть строка в photos
+    originals = [
+        obj.object_name for obj in orphans
+        if not obj.object_name.startswith(TMP_PREFIX) and PHOTO_NAME_RE.match(obj.object_name)[2] is None
+    ]
+    kept: set[str] = set()
+    if originals:
+        async with engine.begin() as conn:
+            # Сначала строки: пока строка есть, загрузка считает фото уже лежащим в бакете.
+            # Фото, которое успели прикрепить к заказу после листинга, не удалится.
+            # Недавно отданное как "уже есть" (last_used_at) — тоже: заказ с ним еще создается
+            await conn.execute(
+                delete(Photo).where(
+                    Photo.object_name.in_(originals),
+                    ~exists().where(OrderPhoto.photo_id == Photo.id),
+                    Photo.last_used_at < func.now() - timedelta(hours=grace_hours),
+                )
+            )
+            result = await conn.execute(select(Photo.object_name).where(Photo.object_name.in_(originals)))
+            kept = {name.split(".")[0] for name in result.scalars()}
+
+    names = [
+        obj.object_name for obj in orphans
+        if obj.object_name.startswith(TMP_PREFIX) or PHOTO_NAME_RE.match(obj.object_name)[1] not in kept
+    ]
+    failed = await remove_objects(names) if names else []
+    if failed:
+        print(f"⚠️ Фото GC: не удалились {len(failed)} объектов, например {failed[0]}")
+    stats.removed += len(names) - len(failed)
+
+
+async def collect_garbage(grace_hours: float | None = None, dry_run: bool = False) -> GcStats:
+    if grace_hours is None:
+        grace_hours = settings.PHOTO_GC_GRACE_HOURS
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+
+    stats = GcStats()
+    orphans: list[Object] = []
+    last_stem = None
+
+    refs = referenced_stems()
+    ref = await anext(refs, None)
+
+    async for page in iter_objects(settings.PHOTO_GC_BATCH_SIZE):
+        for obj in page:
+            stats.scanned += 1
+            name = obj.object_name
+            if obj.last_modified is None or obj.last_modified >= cutoff:
+                continue
+
+            if name.startswith(TMP_PREFIX):
+                stem = name
+            else:
+                match = PHOTO_NAME_RE.match(name)
+                if match is None:
+                    continue # Не наш формат имени — не трогаем
+                # Ключи отсортированы, а имя без расширения — префикс ключа
+                # фиксированной длины (64 / 36), так что stem тоже идут по возрастанию
+                stem = match[1]
+                while ref is not None and ref < stem:
+                    ref = await anext(refs, None)
+                if ref == stem:
+                    continue
+
+            # Оригинал и его превью — всегда в одной пачке (см. kept в _remove_orphans)
+            if len(orphans) >= settings.PHOTO_GC_BATCH_SIZE and stem != last_stem:
+                await _remove_orphans(orphans, grace_hours, stats, dry_run)
+                orphans = []
+            orphans.append(obj)
+            last_stem = stem
+
+    if orphans:
+        await _remove_orphans(orphans, grace_hours, stats, dry_run)
+    return stats
+
+
+@scheduler.job("photo_gc", interval=settings.PHOTO_GC_INTERVAL_SECONDS)
+async def photo_gc_job() -> None:
+    stats = await collect_garbage()
+    if stats.removed:
+        print(f"🧹 Фото GC: удалено {stats.removed} объектов ({stats.orphan_bytes / 1024 / 1024:.1f} МБ)")
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Удаление фото, которые не попали ни в один заказ")
+    parser.add_argument("--grace-hours", type=float, default=settings.PHOTO_GC_GRACE_HOURS)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    args = parser.parse_args()
+
+    stats = await collect_garbage(args.grace_hours, args.dry_run)
+    await engine.dispose()
+
+    print(
+        f"✅ Просмотрено {stats.scanned}, мусора {stats.orphans} "
+        f"({stats.orphan_bytes / 1024 / 1024:.1f} МБ), удалено {stats.removed}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
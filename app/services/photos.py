@@ -0,0 +1,89 @@
+# app/services/photos.py
+"""
+Фото по содержимому (content addressing).
+
+Имя объекта в бакете — sha256 файла + расширение по типу. Одинаковые фото
+(повторная отправка формы, ретрай на плохой связи) хранятся один раз, а клиент,
+приславший хеш заранее, вообще не передает байты, если такое фото уже есть.
+
+Строка в photos появляется только для проверенного объекта (хеш сошелся),
+поэтому наличие строки — надежный признак "байты уже лежат в бакете".
+Какие фото в каких заказах — order_photos (счетчик ссылок).
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import select, update, literal, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.photo import Photo, OrderPhoto
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+# sha256 (или uuid4 у старых загрузок) + _thumb / _md у вариантов + расширение
+PHOTO_NAME_PATTERN = r"^([0-9a-f]{64}|[0-9a-f-]{36})(_[a-z]+)?\.[a-z0-9]{2,5}$"
+PHOTO_NAME_RE = re.compile(PHOTO_NAME_PATTERN)
+
+
+def photo_key(sha256: str, extension: str) -> str:
+    return f"{sha256}.{extension}"
+
+
+async def touch_photo(session: AsyncSession, object_name: str) -> Photo | None:
+    """
+    Проверенное фото по имени (None — нет) с обновленным last_used_at.
+    Для дедупликации: ответили "уже есть" — photo_gc не удалит фото, пока
+    клиент не успел прикрепить его к заказу. Коммит — за вызывающим.
+    """
+    result = await session.execute(
+        update(Photo)
+        .where(Photo.object_name == object_name)
+        .values(last_used_at=func.now())
+        .returning(Photo)
+    )
+    return result.scalar_one_or_none()
+
+
+async def record_photo(
+    session: AsyncSession,
+    object_name: str,
+    owner_id: int,
+    content_type: str,
+    size: int,
+    etag: str,
+) -> bool:
+    """Записывает проверенный объект. False — такое фото уже было (гонка двух загрузок)."""
+    result = await session.execute(
+        pg_insert(Photo)
+        .values(
+            object_name=object_name,
+            owner_id=owner_id,
+            content_type=content_type,
+            size=size,
+            etag=etag,
+        )
+        .on_conflict_do_nothing(index_elements=[Photo.object_name])
+        .returning(Photo.id)
+    )
+    return result.scalar() is not None
+
+
+async def link_order_photos(
+    session: AsyncSession,
+    order_id: int,
+    order_created_at: datetime,
+    names: list[str],
+) -> None:
+    """+1 ссылка на каждое известное фото из names (неизвестные имена пропускаем)."""
+    if not names:
+        return
+    photo_ids = select(
+        literal(order_id, OrderPhoto.order_id.type),
+        literal(order_created_at, OrderPhoto.order_created_at.type),
+        Photo.id,
+    ).where(Photo.object_name.in_(names))
+    await session.execute(
+        pg_insert(OrderPhoto)
+        .from_select(["order_id", "order_created_at", "photo_id"], photo_ids)
+        .on_conflict_do_nothing()
+    )
@@ -0,0 +1,77 @@
+# app/services/scheduler.py
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, func
+
+from app.core.database import engine
+
+
+@dataclass
+class Job:
+    name: str
+    interval: float
+    func: Callable[[], Awaitable[None]]
+
+
+class Scheduler:
+    """
+    Периодические задачи внутри процесса (asyncio).
+
+    Каждый uvicorn-воркер крутит свой планировщик, но задача выполняется только
+    там, где удалось взять advisory lock Postgres (pg_try_advisory_lock по имени
+    задачи). Остальные процессы этот запуск пропускают. Лок сессионный, держим
+    его на отдельном коннекте всё время работы задачи, а сама задача может
+    коммитить сколько угодно раз (например, пачками).
+    """
+
+    def __init__(self):
+        self._jobs: list[Job] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def job(self, name: str, interval: float):
+        """Декоратор: async-функция без аргументов, запускать раз в interval секунд."""
+        def decorator(fn: Callable[[], Awaitable[None]]):
+            self._jobs.append(Job(name, interval, fn))
+            return fn
+        return decorator
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self._jobs]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(job.interval)
+            try:
+                await self.run_once(job)
+            except Exception as e:
+                print(f"❌ Scheduler: задача {job.name} упала: {e}")
+
+    async def run_now(self, name: str) -> bool:
+        """Запустить задачу по имени сейчас, не дожидаясь интервала (например, при старте)."""
+        job = next(job for job in self._jobs if job.name == name)
+        return await self.run_once(job)
+
+    async def run_once(self, job: Job) -> bool:
+        """Выполняет задачу, если ее сейчас не выполняет другой процесс."""
+        lock_key = func.hashtext(f"scheduler:{job.name}")
+        async with engine.connect() as conn:
+            locked = (await conn.execute(select(func.pg_try_advisory_lock(lock_key)))).scalar()
+            await conn.commit()
+            if not locked:
+                return False
+            try:
+                await job.func()
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(lock_key)))
+                await conn.commit()
+        return True
+
+
+scheduler = Scheduler()
@@ -0,0 +1,126 @@
+# app/services/swipes.py
+import html
+
+from aiogram.types import WebAppInfo
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy import select, values, column, cast, Integer, Boolean, Text, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.order import Order, OrderResponse
+from app.models.user import User
+from app.schemas.response import SwipeAction
+from app.services.order_states import searching, searching_since
+from app.services.outbox import enqueue_message
+
+
+async def record_swipes(
+    session: AsyncSession,
+    worker_id: int,
+    actions: list[SwipeAction],
+) -> list[dict]:
+    """
+    Записывает пачку свайпов мастера ОДНИМ запросом:
+    INSERT ... SELECT ... ON CONFLICT (worker_id, order_id) DO NOTHING RETURNING.
+
+    Свайп идемпотентен: повтор (ретрай, второе устройство) ничего не пишет
+    и получает статус "already_exists". Коммит — на вызывающем.
+    Возвращает результат для каждого действия в том же порядке.
+    """
+    # Внутри одной пачки на заказ учитываем только первое действие
+    first: dict[int, SwipeAction] = {}
+    for action in actions:
+        first.setdefault(action.order_id, action)
+
+    rows = values(
+        column("order_id", Integer),
+        column("is_skipped", Boolean),
+        column("proposed_price", Integer),
+        column("message", Text),
+        name="swipes",
+    ).data([
+        (a.order_id, a.action == "skip", a.price, a.message)
+        for a in first.values()
+    ])
+
+    # Реагировать можно только на открытые заказы — заодно это защищает от FK-ошибки.
+    # CAST обязателен: если в пачке одни пропуски, у колонки из NULL'ов нет типа
+    source = (
+        select(
+            rows.c.order_id,
+            Order.created_at, # Ключ партиции order_responses
+            literal(worker_id, Integer),
+            cast(rows.c.is_skipped, Boolean),
+            cast(rows.c.proposed_price, Integer),
+            cast(rows.c.message, Text),
+        )
+        .join(Order, Order.id == rows.c.order_id)
+        # Граница по created_at — иначе каждый id ищется во всех месячных партициях
+        .where(searching(), Order.created_at >= searching_since())
+    )
+    stmt = (
+        pg_insert(OrderResponse)
+        .from_select(["order_id", "order_created_at", "worker_id", "is_skipped", "proposed_price", "message"], source)
+        .on_conflict_do_nothing(index_elements=[
+            OrderResponse.worker_id, OrderResponse.order_id, OrderResponse.order_created_at
+        ])
+        .returning(OrderResponse.order_id)
+    )
+    inserted = set((await session.execute(stmt)).scalars().all())
+
+    # Редкий путь: что-то не вставилось — уточняем, дубль это или заказ уже закрыт
+    leftovers = first.keys() - inserted
+    existing = set()
+    if leftovers:
+        result = await session.execute(
+            select(OrderResponse.order_id).where(
+                OrderResponse.worker_id == worker_id,
+                OrderResponse.order_id.in_(leftovers),
+                # Старше — заказ уже протух, для клиента это "unavailable"
+                OrderResponse.order_created_at >= searching_since(),
+            )
+        )
+        existing = set(result.scalars().all())
+
+    results = []
+    for action in actions:
+        if action.order_id in inserted and first[action.order_id] is action:
+            status = "skipped" if action.action == "skip" else "applied"
+        elif action.order_id in inserted or action.order_id in existing:
+            status = "already_exists"
+        else:
+            status = "unavailable"
+        results.append({
+            "order_id": action.order_id,
+            "idempotency_key": action.idempotency_key,
+            "status": status,
+        })
+    return results
+
+
+async def enqueue_application_notices(session: AsyncSession, worker_id: int, order_ids: list[int]) -> None:
+    """
+    Клиентам — "на ваш заказ новый отклик" (через outbox, в транзакции свайпов).
+    order_ids — заказы, на которые мастер только что откликнулся.
+    """
+    if not order_ids:
+        return
+
+    result = await session.execute(
+        select(Order.id, Order.service_type, User.tg_id, OrderResponse.proposed_price)
+        .join(User, User.id == Order.customer_id)
+        .join(OrderResponse, (OrderResponse.order_id == Order.id) & (OrderResponse.order_created_at == Order.created_at))
+        .where(
+            Order.id.in_(order_ids),
+            Order.created_at >= searching_since(), # Только что откликнулся — заказ еще в поиске
+            OrderResponse.worker_id == worker_id,
+        )
+    )
+    for order_id, service_type, customer_tg_id, price in result.all():
+        builder = InlineKeyboardBuilder()
+        builder.button(text="👀 Смотреть отклики", web_app=WebAppInfo(url=f"{settings.BASE_URL}/webapp/orders/{order_id}"))
+        text = f"📩 <b>На ваш заказ «{html.escape(service_type)}» новый отклик!</b>"
+        if price:
+            text += f"\nЦена мастера: {price} ₽"
+        enqueue_message(session, customer_tg_id, text, parse_mode="HTML", reply_markup=builder.as_markup())
@@ -10,6 +10,8 @@ from alembic import context
 from app.core.database import Base
 from app.models.user import User, WorkerProfile
 from app.models.order import Order, OrderResponse, OrderStatus
+from app.models.outbox import OutboxMessage
+from app.models.photo import Photo, OrderPhoto
 
 config = context.config
 
@@ -0,0 +1,37 @@
+"""worker home location and geo index
+
+Revision ID: 3c9e41d7a2b8
+Revises: 61e306a4a3ae
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e41d7a2b8'
+down_revision: Union[str, Sequence[str], None] = '61e306a4a3ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('worker_profiles', sa.Column('home_location', geoalchemy2.types.Geometry(geometry_type='POINT', srid=4326, dimension=2, from_text='ST_GeomFromEWKT', name='geometry', spatial_index=False), nullable=True))
+
+    # Индекс из b7df3d757130 был закомментирован — создаем, если его нет
+    op.execute("CREATE INDEX IF NOT EXISTS idx_orders_location ON orders USING gist (location)")
+    # Лента мастера считает расстояния в метрах через geography(location):
+    # ST_DWithin и KNN-сортировка (<->) по этому выражению идут по индексу
+    op.execute("CREATE INDEX IF NOT EXISTS idx_orders_location_geog ON orders USING gist (geography(location))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # idx_orders_location удаляет downgrade ревизии b7df3d757130
+    op.execute("DROP INDEX IF EXISTS idx_orders_location_geog")
+    op.drop_column('worker_profiles', 'home_location')
@@ -0,0 +1,28 @@
+"""photo last_used_at
+
+Revision ID: 4f8a2c6d1e93
+Revises: b2d9e4f61a83
+Create Date: 2026-10-18 21:05:17.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8a2c6d1e93'
+down_revision: Union[str, Sequence[str], None] = 'b2d9e4f61a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('photos', sa.Column('last_used_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('photos', 'last_used_at')
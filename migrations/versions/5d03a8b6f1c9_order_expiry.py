@@ -0,0 +1,34 @@
+"""order expiry
+
+Revision ID: 5d03a8b6f1c9
+Revises: b41d8e0f7a62
+Create Date: 2026-10-18 13:47:52.090417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d03a8b6f1c9'
+down_revision: Union[str, Sequence[str], None] = 'b41d8e0f7a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Новое значение enum нельзя использовать в той же транзакции — добавляем отдельно
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE orderstatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+
+    op.create_index('idx_orders_searching_created', 'orders', ['created_at'], unique=False, postgresql_where=sa.text("status = 'SEARCHING'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_orders_searching_created', table_name='orders', postgresql_where=sa.text("status = 'SEARCHING'"))
+    # Значение из enum Postgres удалить нельзя — просто переводим такие заказы в CANCELED
+    op.execute("UPDATE orders SET status = 'CANCELED' WHERE status = 'EXPIRED'")
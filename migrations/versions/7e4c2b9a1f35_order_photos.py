@@ -0,0 +1,49 @@
+"""order photos
+
+Revision ID: 7e4c2b9a1f35
+Revises: d5a18f3c7e90
+Create Date: 2026-10-18 17:14:05.562931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4c2b9a1f35'
+down_revision: Union[str, Sequence[str], None] = 'd5a18f3c7e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_photos',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_created_at', sa.DateTime(), nullable=False),
+    sa.Column('photo_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['photo_id'], ['photos.id'], ),
+    sa.PrimaryKeyConstraint('order_id', 'order_created_at', 'photo_id')
+    )
+    op.create_index(op.f('ix_order_photos_photo_id'), 'order_photos', ['photo_id'], unique=False)
+
+    # Ссылки для уже существующих заказов (фото лежат в orders.photos JSON-массивом имен)
+    op.execute("""
+        INSERT INTO order_photos (order_id, order_created_at, photo_id)
+        SELECT o.id, o.created_at, p.id
+        FROM orders o
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE WHEN json_typeof(o.photos) = 'array' THEN o.photos ELSE '[]'::json END
+        ) AS e(name)
+        JOIN photos p ON p.object_name = e.name
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_photos_photo_id'), table_name='order_photos')
+    op.drop_table('order_photos')
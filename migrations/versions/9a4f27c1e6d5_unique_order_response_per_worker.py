@@ -0,0 +1,37 @@
+"""unique order response per worker
+
+Revision ID: 9a4f27c1e6d5
+Revises: 3c9e41d7a2b8
+Create Date: 2026-10-18 11:04:07.552913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f27c1e6d5'
+down_revision: Union[str, Sequence[str], None] = '3c9e41d7a2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # skip_order раньше не проверял дубли — чистим их перед уникальным индексом.
+    # Из нескольких записей оставляем отклик (а не пропуск), при равенстве — самую раннюю
+    op.execute("""
+        DELETE FROM order_responses a
+        USING order_responses b
+        WHERE a.worker_id = b.worker_id
+          AND a.order_id = b.order_id
+          AND (b.is_skipped::int, b.id) < (a.is_skipped::int, a.id)
+    """)
+    op.create_index('uq_order_responses_worker_order', 'order_responses', ['worker_id', 'order_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_order_responses_worker_order', table_name='order_responses')
@@ -0,0 +1,32 @@
+"""default partitions for orders and order_responses
+
+Revision ID: b2d9e4f61a83
+Revises: 7e4c2b9a1f35
+Create Date: 2026-10-18 19:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d9e4f61a83'
+down_revision: Union[str, Sequence[str], None] = '7e4c2b9a1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Страховка: если партицию месяца не создали вовремя, INSERT не падает.
+    # Строки отсюда ensure_partitions переносит в месячную партицию
+    op.execute("CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT")
+    op.execute("CREATE TABLE IF NOT EXISTS order_responses_default PARTITION OF order_responses DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Строки в DEFAULT потеряются вместе с таблицей — сначала создайте партиции (ensure)
+    op.execute("DROP TABLE IF EXISTS order_responses_default")
+    op.execute("DROP TABLE IF EXISTS orders_default")
@@ -0,0 +1,29 @@
+"""order version
+
+Revision ID: b41d8e0f7a62
+Revises: e2b7c5a9d314
+Create Date: 2026-10-18 13:02:18.559310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d8e0f7a62'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c5a9d314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # server_default заполнит существующие заказы версией 1
+    op.add_column('orders', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'version')
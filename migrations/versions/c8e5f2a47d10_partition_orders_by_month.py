@@ -0,0 +1,169 @@
+"""partition orders by month
+
+Revision ID: c8e5f2a47d10
+Revises: 5d03a8b6f1c9
+Create Date: 2026-10-18 14:36:09.711582
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+from sqlalchemy.dialects import postgresql
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e5f2a47d10'
+down_revision: Union[str, Sequence[str], None] = '5d03a8b6f1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ORDER_COLUMNS = "id, created_at, customer_id, worker_id, service_type, price, duration, comment, photos, location, address, status, version"
+RESPONSE_COLUMNS = "id, created_at, order_id, worker_id, message, proposed_price, is_skipped"
+
+# Сколько месяцев вперед создать сразу. Дальше — задача ensure_partitions
+# (app/services/partitions.py). Хелперы ниже — копия на момент миграции:
+# миграция не должна зависеть от текущих настроек и кода приложения
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} "
+        f"PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+    )
+
+
+order_status = postgresql.ENUM('SEARCHING', 'IN_PROGRESS', 'COMPLETED', 'CANCELED', 'EXPIRED', name='orderstatus', create_type=False)
+
+
+def _order_columns(partitioned: bool) -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq'::regclass)"), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('worker_id', sa.Integer(), nullable=True),
+        sa.Column('service_type', sa.String(), nullable=False),
+        sa.Column('price', sa.Integer(), nullable=False),
+        sa.Column('duration', sa.String(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('photos', sa.JSON(), nullable=True),
+        sa.Column('location', geoalchemy2.types.Geometry(geometry_type='POINT', srid=4326, dimension=2, from_text='ST_GeomFromEWKT', name='geometry', spatial_index=False, nullable=False), nullable=False),
+        sa.Column('address', sa.String(), nullable=False),
+        sa.Column('status', order_status, nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['worker_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    ]
+
+
+def _create_order_indexes() -> None:
+    op.create_index(op.f('ix_orders_service_type'), 'orders', ['service_type'], unique=False)
+    op.execute("CREATE INDEX idx_orders_location ON orders USING gist (location)")
+    op.execute("CREATE INDEX idx_orders_location_geog ON orders USING gist (geography(location))")
+    op.create_index('idx_orders_searching_created', 'orders', ['created_at'], unique=False, postgresql_where=sa.text("status = 'SEARCHING'"))
+
+
+def _move_aside() -> None:
+    # Имена индексов и PK глобальны в схеме — старые убираем с дороги
+    for index in ('ix_orders_service_type', 'idx_orders_location', 'idx_orders_location_geog',
+                  'idx_orders_searching_created', 'uq_order_responses_worker_order'):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    op.execute("ALTER TABLE order_responses RENAME TO order_responses_old")
+    op.execute("ALTER TABLE order_responses_old RENAME CONSTRAINT order_responses_pkey TO order_responses_old_pkey")
+    op.execute("ALTER TABLE orders RENAME TO orders_old")
+    op.execute("ALTER TABLE orders_old RENAME CONSTRAINT orders_pkey TO orders_old_pkey")
+
+
+def _drop_old() -> None:
+    # Sequence'ы переезжают к новым таблицам, иначе удалятся вместе со старыми
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute("ALTER SEQUENCE order_responses_id_seq OWNED BY order_responses.id")
+    op.drop_table('order_responses_old')
+    op.drop_table('orders_old')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _move_aside()
+
+    # --- orders: RANGE (created_at), PK (id, created_at) ---
+    op.create_table('orders', *_order_columns(partitioned=True), postgresql_partition_by='RANGE (created_at)')
+    _create_order_indexes()
+
+    # --- order_responses: RANGE (order_created_at) — те же границы, что у заказа ---
+    op.create_table('order_responses',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_responses_id_seq'::regclass)"), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_created_at', sa.DateTime(), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('proposed_price', sa.Integer(), nullable=True),
+    sa.Column('is_skipped', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id', 'order_created_at'], ['orders.id', 'orders.created_at'], name='fk_order_responses_order'),
+    sa.ForeignKeyConstraint(['worker_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'order_created_at'),
+    postgresql_partition_by='RANGE (order_created_at)'
+    )
+    op.create_index('uq_order_responses_worker_order', 'order_responses', ['worker_id', 'order_id', 'order_created_at'], unique=True)
+
+    # --- Партиции: от месяца самого старого заказа до MONTHS_AHEAD вперед ---
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM orders_old")).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(_create_partition_sql('orders', month))
+        op.execute(_create_partition_sql('order_responses', month))
+        month = _add_months(month, 1)
+
+    # --- Данные ---
+    op.execute(f"INSERT INTO orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM orders_old")
+    op.execute("""
+        INSERT INTO order_responses (id, created_at, order_id, order_created_at, worker_id, message, proposed_price, is_skipped)
+        SELECT r.id, r.created_at, r.order_id, o.created_at, r.worker_id, r.message, r.proposed_price, r.is_skipped
+        FROM order_responses_old r
+        JOIN orders_old o ON o.id = r.order_id
+    """)
+
+    _drop_old()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _move_aside()
+
+    op.create_table('orders', *_order_columns(partitioned=False))
+    _create_order_indexes()
+
+    op.create_table('order_responses',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_responses_id_seq'::regclass)"), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('proposed_price', sa.Integer(), nullable=True),
+    sa.Column('is_skipped', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['worker_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_order_responses_worker_order', 'order_responses', ['worker_id', 'order_id'], unique=True)
+
+    op.execute(f"INSERT INTO orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM orders_old")
+    op.execute(f"INSERT INTO order_responses ({RESPONSE_COLUMNS}) SELECT {RESPONSE_COLUMNS} FROM order_responses_old")
+
+    # Партиции удалятся вместе со старыми (партиционированными) таблицами.
+    # Отцепленные в схему archive месяцы не возвращаем — их можно перелить вручную
+    _drop_old()
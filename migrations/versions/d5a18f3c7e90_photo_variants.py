@@ -0,0 +1,32 @@
+"""photo variants
+
+Revision ID: d5a18f3c7e90
+Revises: a7c3e91d0b24
+Create Date: 2026-10-18 16:41:12.904376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a18f3c7e90'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e91d0b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('photos', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    op.add_column('photos', sa.Column('process_error', sa.Text(), nullable=True))
+    op.create_index('idx_photos_unprocessed', 'photos', ['created_at'], unique=False, postgresql_where=sa.text('processed_at IS NULL AND process_error IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_photos_unprocessed', table_name='photos', postgresql_where=sa.text('processed_at IS NULL AND process_error IS NULL'))
+    op.drop_column('photos', 'process_error')
+    op.drop_column('photos', 'processed_at')
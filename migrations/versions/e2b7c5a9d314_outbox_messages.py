@@ -0,0 +1,43 @@
+"""outbox messages
+
+Revision ID: e2b7c5a9d314
+Revises: 9a4f27c1e6d5
+Create Date: 2026-10-18 12:21:36.104872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c5a9d314'
+down_revision: Union[str, Sequence[str], None] = '9a4f27c1e6d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('parse_mode', sa.String(), nullable=True),
+    sa.Column('reply_markup', sa.JSON(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_outbox_pending', 'outbox_messages', ['available_at'], unique=False, postgresql_where=sa.text('sent_at IS NULL AND failed_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_outbox_pending', table_name='outbox_messages', postgresql_where=sa.text('sent_at IS NULL AND failed_at IS NULL'))
+    op.drop_table('outbox_messages')
@@ -0,0 +1,51 @@
+"""hot query indexes
+
+Revision ID: f31a9c6e2b57
+Revises: c8e5f2a47d10
+Create Date: 2026-10-18 15:20:44.187236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f31a9c6e2b57'
+down_revision: Union[str, Sequence[str], None] = 'c8e5f2a47d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индексы на партиционированных таблицах создаются сразу на всех партициях
+    # (CONCURRENTLY для родителя Postgres не умеет) — на большой базе катить в окно
+
+    # orders: лента, "мои заказы", "мои работы"
+    op.create_index('idx_orders_searching_service', 'orders', ['service_type', sa.text('id DESC')], unique=False, postgresql_where=sa.text("status = 'SEARCHING'"))
+    op.create_index('idx_orders_searching_geog', 'orders', [sa.text('geography(location)')], unique=False, postgresql_using='gist', postgresql_where=sa.text("status = 'SEARCHING'"))
+    op.create_index('idx_orders_customer_created', 'orders', ['customer_id', sa.text('created_at DESC')], unique=False, postgresql_include=['id', 'service_type', 'price', 'status', 'address'])
+    op.create_index('idx_orders_worker_status', 'orders', ['worker_id', 'status', sa.text('created_at DESC')], unique=False, postgresql_where=sa.text('worker_id IS NOT NULL'))
+    # Заменены частичными индексами выше
+    op.drop_index('ix_orders_service_type', table_name='orders')
+    op.drop_index('idx_orders_location_geog', table_name='orders')
+
+    # order_responses: отклики на заказ без пропусков
+    op.create_index('idx_order_responses_applications', 'order_responses', ['order_id', 'order_created_at'], unique=False, postgresql_where=sa.text('NOT is_skipped'))
+
+    # users: рассылка новых заказов мастерам
+    op.create_index('idx_users_workers_by_service', 'users', ['service_type', 'id'], unique=False, postgresql_where=sa.text("role = 'worker'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_users_workers_by_service', table_name='users', postgresql_where=sa.text("role = 'worker'"))
+    op.drop_index('idx_order_responses_applications', table_name='order_responses', postgresql_where=sa.text('NOT is_skipped'))
+    op.execute("CREATE INDEX idx_orders_location_geog ON orders USING gist (geography(location))")
+    op.create_index('ix_orders_service_type', 'orders', ['service_type'], unique=False)
+    op.drop_index('idx_orders_worker_status', table_name='orders', postgresql_where=sa.text('worker_id IS NOT NULL'))
+    op.drop_index('idx_orders_customer_created', table_name='orders', postgresql_include=['id', 'service_type', 'price', 'status', 'address'])
+    op.drop_index('idx_orders_searching_geog', table_name='orders', postgresql_using='gist', postgresql_where=sa.text("status = 'SEARCHING'"))
+    op.drop_index('idx_orders_searching_service', table_name='orders', postgresql_where=sa.text("status = 'SEARCHING'"))
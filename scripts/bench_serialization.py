@@ -0,0 +1,88 @@
+# scripts/bench_serialization.py
+"""
+Микробенчмарк сериализации списков (без БД): сколько строк в секунду отдаем.
+
+    python -m scripts.bench_serialization --rows 50 --repeat 2000
+
+orm  — как было: ORM-объекты Order -> response_model (from_attributes)
+       -> dump в python (mode="json") -> json.dumps, как делает FastAPI.
+fast — как сейчас: строки-словари из SQL -> fast_json (app/core/responses.py).
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from pydantic import TypeAdapter
+
+from app.core.responses import fast_json
+from app.models.order import Order, OrderStatus
+from app.schemas.order import OrderFeedPage
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now()
+    return [
+        {
+            "id": 100_000 + i,
+            "service_type": "electrician",
+            "price": 1000 + i,
+            "status": OrderStatus.SEARCHING,
+            "address": f"ул. Навои, {i}",
+            "created_at": now - timedelta(minutes=i),
+            "duration": "2 часа",
+            "comment": "Не работает розетка на кухне",
+            "photos": [f"{i}_a.jpg", f"{i}_b.jpg"],
+            "version": 1,
+            "lat": 41.31 + i / 10_000,
+            "lon": 69.24 + i / 10_000,
+            "distance_km": round(i / 7, 2),
+        }
+        for i in range(count)
+    ]
+
+
+def orm_path(rows: list[dict]) -> bytes:
+    # ORM-объекты строим из тех же данных (в жизни их строит session.execute)
+    orders = []
+    for row in rows:
+        order = Order(**{k: v for k, v in row.items() if k not in ("lat", "lon", "distance_km")})
+        order.lat, order.lon, order.distance_km = row["lat"], row["lon"], row["distance_km"]
+        orders.append(order)
+
+    adapter = TypeAdapter(OrderFeedPage)
+    content = adapter.dump_python(adapter.validate_python({"items": orders, "next_cursor": None}), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_path(rows: list[dict]) -> bytes:
+    return fast_json(OrderFeedPage, {"items": rows, "next_cursor": None}).body
+
+
+def bench(name: str, fn, rows: list[dict], repeat: int) -> float:
+    fn(rows)  # прогрев (TypeAdapter, кеши)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    elapsed = time.perf_counter() - started
+    rate = len(rows) * repeat / elapsed
+    print(f"⏱ {name:<5} {rate:>12,.0f} строк/с  ({elapsed / repeat * 1000:.3f} мс на ответ из {len(rows)})")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сериализация списков: ORM + response_model против fast_json")
+    parser.add_argument("--rows", type=int, default=50, help="строк в одном ответе")
+    parser.add_argument("--repeat", type=int, default=2000, help="сколько ответов собрать")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    assert json.loads(orm_path(rows)) == json.loads(fast_path(rows)), "ответы отличаются"
+
+    before = bench("orm", orm_path, rows, args.repeat)
+    after = bench("fast", fast_path, rows, args.repeat)
+    print(f"✅ Ускорение: x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
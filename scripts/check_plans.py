@@ -0,0 +1,256 @@
+# scripts/check_plans.py
+"""
+Проверка планов горячих запросов: EXPLAIN для каждого запроса роутеров и
+фоновых задач, падаем (exit 1), если где-то Seq Scan по большой таблице.
+
+    python -m scripts.check_plans --seed 200000   # на локальной PostGIS: нальет данные и откатит
+    python -m scripts.check_plans                 # на копии прода / стейджинге, без записи
+
+С --seed всё происходит в одной транзакции, которая в конце откатывается.
+Запросы не копии: их строят те же функции, что вызывает код (*_query в
+app/api/* и app/services/*). Приложение ходит через asyncpg с параметрами
+($1, $2...) и prepared statements, поэтому каждый запрос проверяем так же:
+PREPARE + EXPLAIN EXECUTE с plan_cache_mode = force_generic_plan — это
+общий (generic) план, который Postgres начинает использовать после
+нескольких выполнений, и в нем не видно конкретных значений параметров.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.api.order_router import my_orders_query, order_detail_query, applications_query
+from app.api.worker_router import (
+    newest_feed_query, nearest_feed_query, home_location_query, active_orders_query,
+)
+from app.core.config import settings
+from app.core.database import engine
+from app.models.order import Order
+from app.models.user import User
+from app.services.expiry import stale_orders_query
+from app.services.feed_engine import pool_query, seen_query, page_query
+from app.services.notifier import workers_to_notify_query
+from app.services.order_states import searching, searching_since
+from app.services.outbox import claim_query
+from app.services.partitions import PARTITIONED_TABLES, add_months, month_start, create_partition_sql
+
+# Seq Scan по этим таблицам (и их партициям) — провал
+LARGE_TABLES = ("orders", "order_responses", "users", "outbox_messages")
+
+
+# --- ДАННЫЕ ---
+async def seed(conn: AsyncConnection, orders: int) -> None:
+    users = max(orders // 10, 100)
+    print(f"🌱 Наливаем: {users} юзеров, {orders} заказов, ~{orders * 3} откликов")
+
+    # Партиции за прошлые месяцы (в пустой базе есть только текущий и будущие)
+    current = month_start(date.today())
+    for i in range(1, 3):
+        for table in PARTITIONED_TABLES:
+            await conn.execute(text(create_partition_sql(table, add_months(current, -i))))
+
+    await conn.execute(text("""
+        CREATE TEMP TABLE seed_users ON COMMIT DROP AS
+        WITH ins AS (
+            INSERT INTO users (tg_id, username, name, role, service_type, hashed_password, is_active, is_superuser)
+            SELECT 9000000000 + g, 'plan_check_' || g, 'Seed',
+                   CASE WHEN g % 2 = 0 THEN 'worker' ELSE 'client' END,
+                   (ARRAY['electrician', 'plumber', 'cleaner', 'painter'])[1 + g % 4],
+                   '-', true, false
+            FROM generate_series(1, :users) g
+            RETURNING id, role
+        )
+        SELECT * FROM ins
+    """), {"users": users})
+
+    # Статусы примерно как в жизни: большинство заказов закрыто.
+    # В поиске — только свежие (старые уже протухли бы, см. app/services/expiry.py)
+    await conn.execute(text("""
+        WITH w AS (SELECT array_agg(id) AS ids FROM seed_users WHERE role = 'worker'),
+             c AS (SELECT array_agg(id) AS ids FROM seed_users WHERE role = 'client'),
+             s AS (
+                SELECT g,
+                       CASE WHEN g % 20 < 2 THEN 'SEARCHING'
+                            WHEN g % 20 < 3 THEN 'IN_PROGRESS'
+                            WHEN g % 20 < 15 THEN 'COMPLETED'
+                            ELSE 'CANCELED' END AS status
+                FROM generate_series(1, :orders) g
+             )
+        INSERT INTO orders (customer_id, worker_id, service_type, price, duration, address, location, status, created_at)
+        SELECT c.ids[1 + s.g % array_length(c.ids, 1)],
+               CASE WHEN s.status IN ('IN_PROGRESS', 'COMPLETED') THEN w.ids[1 + s.g % array_length(w.ids, 1)] END,
+               (ARRAY['electrician', 'plumber', 'cleaner', 'painter'])[1 + s.g % 4],
+               1000 + s.g % 5000, '2', 'plan-check seed',
+               ST_SetSRID(ST_MakePoint(69.1 + random() * 0.5, 41.2 + random() * 0.3), 4326),
+               s.status::orderstatus,
+               CASE WHEN s.status = 'SEARCHING' THEN now() - random() * interval '48 hours'
+                    ELSE now() - random() * (now() - date_trunc('month', now() - interval '2 months')) END
+        FROM s, w, c
+    """), {"orders": orders})
+
+    await conn.execute(text("""
+        WITH w AS (SELECT array_agg(id) AS ids FROM seed_users WHERE role = 'worker')
+        INSERT INTO order_responses (order_id, order_created_at, worker_id, is_skipped, created_at)
+        SELECT o.id, o.created_at, w.ids[1 + (o.id * 7 + j * 13) % array_length(w.ids, 1)], random() < 0.8, o.created_at
+        FROM orders o CROSS JOIN generate_series(1, 3) j, w
+        WHERE o.address = 'plan-check seed'
+        ON CONFLICT DO NOTHING
+    """))
+
+    for table in ("users", "orders", "order_responses", "outbox_messages"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def pick_ids(conn: AsyncConnection) -> dict:
+    """Реальные id для подстановки в запросы."""
+    worker = (await conn.execute(
+        select(User.id, User.service_type).where(User.role == "worker", User.service_type.is_not(None)).limit(1)
+    )).first()
+    customer_id = (await conn.execute(select(Order.customer_id).limit(1))).scalar()
+    order_id = (await conn.execute(select(Order.id).where(Order.customer_id == customer_id).limit(1))).scalar()
+    if worker is None or customer_id is None:
+        sys.exit("❌ В базе нет мастеров или заказов — запустите с --seed N")
+    page_ids = (await conn.execute(
+        select(Order.id).where(searching(), Order.created_at >= searching_since()).limit(10)
+    )).scalars().all()
+    return {
+        "worker_id": worker.id,
+        "service_type": worker.service_type,
+        "customer_id": customer_id,
+        "order_id": order_id,
+        "page_ids": list(page_ids) or [order_id],
+    }
+
+
+# --- ЗАПРОСЫ (те же функции, что в коде) ---
+def hot_queries(ids: dict) -> dict:
+    worker_id, service_type = ids["worker_id"], ids["service_type"]
+    customer_id, order_id = ids["customer_id"], ids["order_id"]
+    lat, lon = 41.3, 69.25
+    radius_km = settings.FEED_DEFAULT_RADIUS_KM
+
+    return {
+        # app/api/worker_router.py: get_worker_feed (без координат, SQL-ветка)
+        "feed_by_id": newest_feed_query(worker_id, service_type, 10, before_id=10**9),
+        # app/api/worker_router.py: get_worker_feed ("сначала ближайшие", вторая страница)
+        "feed_nearest": nearest_feed_query(worker_id, service_type, 10, lat, lon, radius_km, after=(0.0, 0)),
+        # app/services/feed_engine.py: reload / _get_seen / page
+        "feed_pool_reload": pool_query(),
+        "feed_seen": seen_query(worker_id),
+        "feed_page": page_query(ids["page_ids"], worker_id),
+        # app/api/worker_router.py: get_home_location / get_worker_active_orders
+        "home_location": home_location_query(worker_id),
+        "worker_active": active_orders_query(worker_id),
+        # app/api/order_router.py: get_my_orders (index-only scan) / get_order_detail / get_order_applications
+        "my_orders": my_orders_query(customer_id),
+        "order_detail": order_detail_query(order_id, customer_id),
+        "applications": applications_query(order_id, customer_id),
+        # app/services/notifier.py: notify_new_order (первая пачка)
+        "notify_workers": workers_to_notify_query(service_type, customer_id, lat, lon, after_id=0),
+        # app/services/expiry.py: expire_stale_orders (выбор пачки)
+        "expire_stale": stale_orders_query(searching_since()),
+        # app/services/outbox.py: OutboxRelay._claim
+        "outbox_claim": claim_query(),
+    }
+
+
+# --- ПРОВЕРКА ---
+def is_large(relation: str) -> bool:
+    # Партиции называются <таблица>_pYYYYMM. DEFAULT-партиции (<таблица>_default)
+    # должны быть пустыми — Seq Scan по ним не в счет
+    return any(relation == t or relation.startswith(f"{t}_p") for t in LARGE_TABLES)
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and is_large(plan.get("Relation Name", "")):
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def sql_literal(value) -> str:
+    """
+    Значение для EXECUTE: строка без типа ('...'), Postgres приведет ее к типу
+    параметра из PREPARE (SQLAlchemy для asyncpg пишет $1::INTEGER и т.п.).
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    elif isinstance(value, timedelta):
+        value = f"{value.total_seconds()} seconds"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+async def explain(conn: AsyncConnection, name: str, stmt) -> dict:
+    """Generic-план запроса — как его выполняет приложение (prepared statement с параметрами)."""
+    # render_postcompile: IN (...) разворачивается в $n на каждый элемент, как при выполнении
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    args = []
+    for key in compiled.positiontup:
+        value = params[key]
+        bind = compiled.binds.get(key)
+        processor = bind.type.bind_processor(conn.dialect) if bind is not None else None
+        # Interval для asyncpg процессор превращает в datetime — интервал пишем как есть
+        if processor and not isinstance(value, timedelta):
+            value = processor(value)
+        args.append(sql_literal(value))
+
+    statement = f"plan_check_{name}"
+    execute = f"EXECUTE {statement}({', '.join(args)})" if args else f"EXECUTE {statement}"
+    # DEALLOCATE только на успехе: в упавшей транзакции он сам упадет и скроет исходную ошибку
+    await conn.exec_driver_sql(f"PREPARE {statement} AS {compiled.string}")
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {execute}")).scalar()
+    await conn.exec_driver_sql(f"DEALLOCATE {statement}")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN горячих запросов: нет ли Seq Scan по большим таблицам")
+    parser.add_argument("--seed", type=int, default=0, metavar="N", help="налить N заказов (в транзакции, с откатом)")
+    parser.add_argument("--verbose", action="store_true", help="печатать планы целиком")
+    args = parser.parse_args()
+
+    failed = []
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            if args.seed:
+                await seed(conn, args.seed)
+            ids = await pick_ids(conn)
+            # Как после нескольких выполнений в приложении: план без значений параметров
+            await conn.execute(text("SET LOCAL plan_cache_mode = force_generic_plan"))
+
+            for name, stmt in hot_queries(ids).items():
+                plan = await explain(conn, name, stmt)
+                scans = seq_scans(plan)
+                if scans:
+                    failed.append(name)
+                    print(f"❌ {name}: Seq Scan по {', '.join(sorted(set(scans)))}")
+                else:
+                    print(f"✅ {name}: {plan['Node Type']} (cost {plan['Total Cost']})")
+                if args.verbose or scans:
+                    print(json.dumps(plan, indent=2, ensure_ascii=False))
+        finally:
+            # Ничего не сохраняем: ни данные --seed, ни созданные партиции
+            await trans.rollback()
+    await engine.dispose()
+
+    if failed:
+        print(f"\n❌ Seq Scan в {len(failed)} запросах: {', '.join(failed)}")
+        return 1
+    print("\n✅ Все планы без Seq Scan по большим таблицам")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))